@@ -13,6 +13,7 @@ cli_parser.add_argument("--host", help="panel hostname")
 cli_parser.add_argument("--port", type=int, help="panel port")
 cli_parser.add_argument("-U", "--installer-or-user-code", help="Installer or User code")
 cli_parser.add_argument("-A", "--automation-code", help="Automation passcode")
+cli_parser.add_argument("--capture", help="record all traffic with the panel to this file")
 
 args = cli_parser.parse_args()
 
@@ -28,6 +29,8 @@ panel = Panel(
     automation_code=args.automation_code,
     installer_or_user_code=args.installer_or_user_code,
 )
+if args.capture:
+    panel.start_capture(args.capture)
 try:
     start_t = time.perf_counter()
     loop.run_until_complete(panel.connect())
@@ -36,3 +39,4 @@ try:
     loop.run_forever()
 except KeyboardInterrupt:
     loop.run_until_complete(panel.disconnect())
+    panel.stop_capture()
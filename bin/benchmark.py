@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""Benchmarks for the library, run against the local panel emulator."""
+
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+from datetime import datetime
+
+from bosch_alarm_mode2 import Panel, codec
+from bosch_alarm_mode2.capture import DIRECTION, read_capture
+from bosch_alarm_mode2.const import PANEL_FAMILY, PANEL_MODELS
+from bosch_alarm_mode2.history import History, HistoryEventParams, HistoryParser
+from bosch_alarm_mode2.panel import Area, Point
+from bosch_alarm_mode2.utils import BE_INT, LE_INT
+
+from emulator import PanelEmulator, server_ssl_context
+
+LOG = logging.getLogger(__name__)
+
+
+def _panel(port: int) -> Panel:
+    return Panel(
+        host="127.0.0.1", port=port, automation_code="0123456789", installer_or_user_code="1234"
+    )
+
+
+async def bench_connect(args: argparse.Namespace) -> None:
+    emulator = PanelEmulator(
+        model=args.model, areas=args.areas, points=args.points, latency=args.latency
+    )
+    port = await emulator.start(ssl_context=server_ssl_context())
+    samples = []
+    for _ in range(args.iterations):
+        panel = _panel(port)
+        start_t = time.perf_counter()
+        await panel.connect()
+        samples.append(time.perf_counter() - start_t)
+        await panel.disconnect()
+    await emulator.close()
+    print(
+        "%s, %d areas, %d points: connect median %.1fms, min %.1fms, max %.1fms"
+        % (
+            PANEL_MODELS[args.model].name,
+            args.areas,
+            args.points,
+            statistics.median(samples) * 1000,
+            min(samples) * 1000,
+            max(samples) * 1000,
+        )
+    )
+
+
+async def bench_status(args: argparse.Namespace) -> None:
+    emulator = PanelEmulator(
+        model=args.model,
+        areas=args.areas,
+        points=args.points,
+        push_rate=args.push_rate,
+        push_updates=args.push_updates,
+    )
+    port = await emulator.start(ssl_context=server_ssl_context())
+    panel = _panel(port)
+    await panel.connect()
+    updates = 0
+
+    def count() -> None:
+        nonlocal updates
+        updates += 1
+
+    for point in panel.points.values():
+        point.status_observer.attach(count)
+    start_t, start_cpu = time.perf_counter(), time.process_time()
+    await asyncio.sleep(args.duration)
+    elapsed, cpu = time.perf_counter() - start_t, time.process_time() - start_cpu
+    await panel.disconnect()
+    await emulator.close()
+    print(
+        "%d point updates in %.1fs: %.0f updates/s, %.1fus CPU per update"
+        % (updates, elapsed, updates / elapsed, cpu / max(updates, 1) * 1e6)
+    )
+
+
+def _status_frame(updates: int, points: int) -> bytearray:
+    frame = bytearray()
+    for group in range(0, updates, 255):
+        count = min(255, updates - group)
+        frame += bytes([0x07, count])
+        for i in range(group, group + count):
+            frame += ((i % points) + 1).to_bytes(2, "big") + bytes([0x03])
+    return frame
+
+
+def _legacy_status_update(panel: Panel, data: bytearray) -> None:
+    # The previous dispatch loop: a new consumer table, and a tail copy per update.
+    consumers = {
+        update_type: (lambda data, consumer=consumer: consumer(data, 0), finalizer)
+        for update_type, (consumer, finalizer) in panel._status_consumers.items()
+    }
+    pos = 0
+    while pos < len(data):
+        (update_type, n_updates) = data[pos : pos + 2]
+        pos += 2
+        consumer, finalizer = consumers[update_type]
+        for _ in range(0, n_updates):
+            pos += consumer(data[pos:])
+        if finalizer:
+            finalizer()
+
+
+async def bench_dispatch(args: argparse.Namespace) -> None:
+    panel = _panel(0)
+    panel.points = {id: Point(f"Point {id}") for id in range(1, args.points + 1)}
+    for updates in (1, 20, 200, 2000):
+        frame = _status_frame(updates, args.points)
+        view = memoryview(frame)
+        number = max(1, 20000 // updates)
+        legacy = min(timeit.repeat(lambda: _legacy_status_update(panel, frame), number=number))
+        current = min(timeit.repeat(lambda: panel._on_status_update(view), number=number))
+        print(
+            "%4d updates/frame: legacy %7.1fus, current %7.1fus per frame (%.1fx)"
+            % (updates, legacy / number * 1e6, current / number * 1e6, legacy / current)
+        )
+
+
+def _legacy_event_params(family: PANEL_FAMILY, event: bytearray) -> HistoryEventParams:
+    # The previous decoder: one int.from_bytes call per field.
+    if family == PANEL_FAMILY.BG_SERIES:
+        timestamp = BE_INT.int32(event, 10)
+        date = datetime(
+            2010 + (timestamp >> 26),
+            (timestamp >> 22) & 0x0F,
+            (timestamp >> 17) & 0x1F,
+            (timestamp >> 12) & 0x1F,
+            (timestamp >> 6) & 0x3F,
+            timestamp & 0x3F,
+        )
+        params = (BE_INT.int16(event, 4), BE_INT.int16(event, 6), BE_INT.int16(event, 8))
+        return HistoryEventParams(date, str(BE_INT.int16(event)), BE_INT.int16(event, 2), *params)
+    timestamp = LE_INT.int16(event)
+    timestamp2 = LE_INT.int16(event, 2)
+    date = datetime(
+        2000 + (timestamp2 >> 10),
+        (timestamp2 >> 6) & 0x0F,
+        (timestamp >> 11) & 0x1F,
+        (timestamp >> 6) & 0x1F,
+        timestamp & 0x3F,
+        timestamp2 & 0x3F,
+    )
+    area = LE_INT.int16(event, 4)
+    return HistoryEventParams(date, str(event[6]), area, area, event[7], 0)
+
+
+def _legacy_parse_polled(family: PANEL_FAMILY, parser: HistoryParser, data: bytearray) -> list:
+    # ... and a slice of the remaining response per event.
+    count = data[0]
+    start = BE_INT.int32(data, 1) + 1
+    event_data = data[5:]
+    event_length = len(event_data) // count
+    events = []
+    for i in range(start, start + count):
+        events.append(parser._make_event(i, _legacy_event_params(family, event_data)))
+        event_data = event_data[event_length:]
+    return events
+
+
+def _current_parse_polled(parser: HistoryParser, data: bytearray) -> list:
+    start = parser.parse_start_event_id(data) + 1
+    records = parser.unpack_polled_records(data, 5, data[0])
+    return [parser.parse_polled_record(i, record) for i, record in enumerate(records, start)]
+
+
+async def bench_history(args: argparse.Namespace) -> None:
+    for model in (0xA7, 0x20):
+        emulator = PanelEmulator(model=model, history_events=args.events)
+        history = History()
+        history.init_for_panel(model)
+        parser = history._parser
+        assert parser
+        # Responses of up to 255 events, the most a single response can carry.
+        batches = []
+        for first in range(0, args.events, 255):
+            events = emulator.history[first : first + 255]
+            data = bytearray([len(events)]) + first.to_bytes(4, "big")
+            for event in events:
+                data += emulator._polled_event(*event)
+            batches.append(data)
+        family = emulator.family
+        legacy = min(
+            timeit.repeat(
+                lambda: [_legacy_parse_polled(family, parser, b) for b in batches], number=1
+            )
+        )
+        current = min(
+            timeit.repeat(lambda: [_current_parse_polled(parser, b) for b in batches], number=1)
+        )
+        print(
+            "%s, %d events: legacy %.1fms, current %.1fms (%.1fx)"
+            % (family.value, args.events, legacy * 1e3, current * 1e3, legacy / current)
+        )
+
+
+def _legacy_area_arm(area_id: int, arm_type: int) -> bytearray:
+    request = bytearray([arm_type])
+    request.extend(bytearray((area_id - 1) // 8))
+    request.append(1 << (7 - ((area_id - 1) % 8)))
+    return request
+
+
+def _legacy_request(protocol: int, code: int, data: bytes) -> bytearray:
+    request = bytearray([protocol])
+    request.extend((len(data) + 1).to_bytes(1, "big"))
+    request.append(code)
+    request.extend(data)
+    return request
+
+
+async def bench_codec(args: argparse.Namespace) -> None:
+    frame = bytearray(range(256))
+    view = memoryview(frame)
+    ids = list(range(1, 101))
+    cases = [
+        ("int16 (bytearray)", lambda: BE_INT.int16(frame, 100), lambda: codec.be16(frame, 100)),
+        ("int16 (memoryview)", lambda: BE_INT.int16(view, 100), lambda: codec.be16(view, 100)),
+        ("int32 (memoryview)", lambda: BE_INT.int32(view, 100), lambda: codec.be32(view, 100)),
+        (
+            "request header",
+            lambda: _legacy_request(0x01, 0x27, b"\x00\x01"),
+            lambda: codec.encode_request(0x01, 0x27, b"\x00\x01"),
+        ),
+        (
+            "AREA_ARM request",
+            lambda: _legacy_area_arm(25, 1),
+            lambda: codec.encode_area_arm(25, 1),
+        ),
+        (
+            "100 entity ids",
+            lambda: b"".join(id.to_bytes(2, "big") for id in ids),
+            lambda: codec.encode_ids(ids),
+        ),
+    ]
+    number = args.iterations * 20000
+    for name, legacy_call, current_call in cases:
+        legacy = min(timeit.repeat(legacy_call, number=number)) / number
+        current = min(timeit.repeat(current_call, number=number)) / number
+        print(
+            "%-20s legacy %6.0fns, current %6.0fns per call (%.1fx)"
+            % (name, legacy * 1e9, current * 1e9, legacy / current)
+        )
+
+
+async def bench_memory(args: argparse.Namespace) -> None:
+    panel = _panel(0)
+    for cls in (Area, Point):
+        for observed in (False, True):
+            tracemalloc.start()
+            entities = panel._bind({id: cls(f"Entity {id}") for id in range(1, args.points + 1)})
+            if observed:
+                for entity in entities.values():
+                    entity.status_observer.attach(lambda: None)
+            size = tracemalloc.get_traced_memory()[0]
+            tracemalloc.stop()
+            print(
+                "%-5s %s: %.0f bytes per entity"
+                % (cls.__name__, "observed  " if observed else "unobserved", size / len(entities))
+            )
+
+
+async def bench_replay(args: argparse.Namespace) -> None:
+    path = args.capture
+    if not path:
+        # Capture a session with the emulator pushing status traffic.
+        path = os.path.join(tempfile.mkdtemp(), "session.cap")
+        emulator = PanelEmulator(
+            model=args.model,
+            areas=args.areas,
+            points=args.points,
+            latency=args.latency,
+            push_rate=args.push_rate,
+            push_updates=args.push_updates,
+        )
+        port = await emulator.start(ssl_context=server_ssl_context())
+        panel = _panel(port)
+        panel.start_capture(path)
+        await panel.connect()
+        await asyncio.sleep(args.duration)
+        panel.stop_capture()
+        await panel.disconnect()
+        await emulator.close()
+    records = list(read_capture(path))
+    inbound = sum(len(r.data) for r in records if r.direction == DIRECTION.INBOUND)
+    samples = []
+    for _ in range(args.iterations):
+        panel = _panel(0)
+        start_t = time.perf_counter()
+        await panel.replay(path)
+        samples.append(time.perf_counter() - start_t)
+        frames = panel.metrics.responses + panel.metrics.status_frames
+        await panel.disconnect()
+    best = min(samples)
+    print(
+        "%d frames, %d bytes: replayed in %.1fms (%.0f frames/s, %.1f MB/s)"
+        % (frames, inbound, best * 1000, frames / best, inbound / best / 1e6)
+    )
+
+
+BENCHMARKS = {
+    "connect": bench_connect,
+    "status": bench_status,
+    "dispatch": bench_dispatch,
+    "history": bench_history,
+    "codec": bench_codec,
+    "memory": bench_memory,
+    "replay": bench_replay,
+}
+
+if __name__ == "__main__":
+    cli_parser = argparse.ArgumentParser(description=__doc__)
+    cli_parser.add_argument("benchmark", choices=BENCHMARKS)
+    cli_parser.add_argument("--model", type=lambda v: int(v, 0), default=0xA7, help="panel model")
+    cli_parser.add_argument("--areas", type=int, default=32)
+    cli_parser.add_argument("--points", type=int, default=599)
+    cli_parser.add_argument("--latency", type=float, default=0.005, help="panel response delay")
+    cli_parser.add_argument("--iterations", type=int, default=5)
+    cli_parser.add_argument("--push-rate", type=float, default=100.0)
+    cli_parser.add_argument("--push-updates", type=int, default=200)
+    cli_parser.add_argument("--duration", type=float, default=5.0)
+    cli_parser.add_argument("--events", type=int, default=100000)
+    cli_parser.add_argument(
+        "--capture", help="capture to replay (recorded from the emulator if omitted)"
+    )
+    args = cli_parser.parse_args()
+
+    logging.basicConfig(
+        stream=sys.stdout, format="%(levelname)s: %(message)s", level=logging.WARNING
+    )
+    asyncio.run(BENCHMARKS[args.benchmark](args))
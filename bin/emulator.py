@@ -0,0 +1,568 @@
+#!/usr/bin/env python3
+"""Local emulator of a Bosch alarm panel speaking the "Mode 2" API.
+
+Intended as a reproducible stand-in for a real panel when benchmarking or
+load testing the library. Impersonates any model from PANEL_MODELS, answers
+every command in CMD, and can push subscription traffic at a fixed rate.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from bosch_alarm_mode2.const import (
+    AREA_ARMING_STATUS,
+    AREA_READY_STATUS,
+    AREA_STATUS,
+    CMD,
+    DOOR_ACTION,
+    DOOR_STATUS,
+    OUTPUT_STATUS,
+    PANEL_FAMILY,
+    PANEL_MODELS,
+    POINT_STATUS,
+    PROTOCOL,
+)
+
+LOG = logging.getLogger(__name__)
+
+ACK = b"\xfc"
+NACK = b"\xfd"
+DATA = b"\xfe"
+
+# Largest payload that fits a basic protocol frame (1 byte length, minus the response code).
+MAX_PAYLOAD = 254
+
+# Section 13.2 of the protocol spec: (byte, mask) pairs advertised by each family.
+CAPABILITIES = {
+    PANEL_FAMILY.BG_SERIES: [
+        (0, 0x40),  # subscriptions
+        (2, 0x10),  # alarm memory summary, format 2
+        (5, 0x08),  # panel system status
+        (7, 0x08),  # area text CF03
+        (8, 0x40 | 0x10),  # doors, door text CF01
+        (9, 0x10),  # output text CF03
+        (11, 0x20),  # point text CF03
+        (13, 0x04),  # product serial
+        (16, 0x20 | 0x02),  # set subscription format 1, extended history
+        (24, 0x40),  # set subscription format 2
+    ],
+    PANEL_FAMILY.AMAX: [
+        (0, 0x40),
+        (2, 0x20),  # alarm memory summary, format 1
+        (5, 0x08),
+        (7, 0x20),  # area text CF01
+        (9, 0x40),  # output text CF01
+        (11, 0x80),  # point text CF01
+        (16, 0x20),
+    ],
+    # Solution panels don't advertise subscriptions, so clients fall back to polling.
+    PANEL_FAMILY.SOLUTION: [
+        (5, 0x08),
+        (7, 0x20),
+        (9, 0x40),
+        (11, 0x80),
+    ],
+}
+
+ARM_TYPE_STATUS = {
+    AREA_ARMING_STATUS.DISARM: AREA_STATUS.DISARMED,
+    AREA_ARMING_STATUS.MASTER_INSTANT: 0x09,
+    AREA_ARMING_STATUS.MASTER_DELAY: 0x01,
+    AREA_ARMING_STATUS.PERIMETER_INSTANT: 0x02,
+    AREA_ARMING_STATUS.PERIMETER_DELAY: 0x03,
+    AREA_ARMING_STATUS.STAY1: 0x03,
+    AREA_ARMING_STATUS.STAY2: 0x03,
+    AREA_ARMING_STATUS.AWAY: 0x01,
+}
+
+DOOR_ACTION_STATUS = {
+    DOOR_ACTION.CYCLE: DOOR_STATUS.CYCLING,
+    DOOR_ACTION.UNLOCK: DOOR_STATUS.UNLOCKED,
+    DOOR_ACTION.TERMINATE_UNLOCK: DOOR_STATUS.LOCKED,
+    DOOR_ACTION.SECURE: DOOR_STATUS.SECURED,
+    DOOR_ACTION.TERMINATE_SECURE: DOOR_STATUS.LOCKED,
+}
+
+
+def _id_bitmask(ids: list[int]) -> bytearray:
+    # Entity id 1 is the most significant bit of the first byte.
+    data = bytearray((max(ids, default=0) + 7) // 8)
+    for id in ids:
+        data[(id - 1) // 8] |= 0x80 >> ((id - 1) % 8)
+    return data
+
+
+class PanelEmulator:
+    """Panel state shared by every client session."""
+
+    def __init__(
+        self,
+        model: int = 0xA7,
+        areas: int = 4,
+        points: int = 64,
+        outputs: int = 8,
+        doors: int = 2,
+        history_events: int = 100,
+        latency: float = 0.0,
+        push_rate: float = 0.0,
+        push_updates: int = 1,
+        heartbeat: float = 30.0,
+        max_connections: int = 0,
+        drop_rate: float = 0.0,
+    ) -> None:
+        self.model = model
+        self.family = PANEL_MODELS[model].family
+        self.serial_number = 0x0001_2345_6789
+        self.firmware_version = (3, 14)
+        self.latency = latency
+        self.push_rate = push_rate
+        self.push_updates = push_updates
+        self.heartbeat = heartbeat
+        self.max_connections = max_connections
+        # Fraction of responses that are never sent, as buggy panels do.
+        self.drop_rate = drop_rate
+        self.faults = 0
+
+        self.bitmask = bytearray(33)
+        for index, mask in CAPABILITIES[self.family]:
+            self.bitmask[index] |= mask
+        if self.family != PANEL_FAMILY.BG_SERIES:
+            doors = 0
+
+        self.areas = {id: AREA_STATUS.DISARMED for id in range(1, areas + 1)}
+        self.area_ready = {id: AREA_READY_STATUS.ALL for id in self.areas}
+        self.points = {id: POINT_STATUS.NORMAL for id in range(1, points + 1)}
+        self.outputs = {id: OUTPUT_STATUS.INACTIVE for id in range(1, outputs + 1)}
+        self.doors = {id: DOOR_STATUS.LOCKED for id in range(1, doors + 1)}
+
+        start = datetime.now().replace(microsecond=0) - timedelta(minutes=history_events)
+        self.history = [
+            (start + timedelta(minutes=i), (i % len(self.areas)) + 1 if self.areas else 1, i)
+            for i in range(history_events)
+        ]
+
+        self.sessions: list[Session] = []
+        self._server: asyncio.Server | None = None
+        self._tasks: list[asyncio.Task[None]] = []
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, ssl_context: ssl.SSLContext | None = None
+    ) -> int:
+        """Start listening and return the bound port."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: Session(self), host=host, port=port, ssl=ssl_context or server_ssl_context()
+        )
+        if self.push_rate:
+            self._tasks.append(loop.create_task(self._push_loop()))
+        if self.heartbeat:
+            self._tasks.append(loop.create_task(self._heartbeat_loop()))
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for session in list(self.sessions):
+            session.close()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def publish(self, updates: list[tuple[int, list[bytes]]]) -> None:
+        """Send a status frame with the given (update type, records) to subscribers."""
+        data = bytearray()
+        for update_type, records in updates:
+            data += bytes([update_type, len(records)])
+            for record in records:
+                data += record
+        for session in self.sessions:
+            if session.subscribed:
+                session.push(data)
+
+    def _random_point_updates(self, count: int) -> list[bytes]:
+        records = []
+        for id in random.sample(list(self.points), min(count, len(self.points))):
+            self.points[id] = (
+                POINT_STATUS.NORMAL if self.points[id] != POINT_STATUS.NORMAL else 0x02
+            )
+            records.append(id.to_bytes(2, "big") + bytes([self.points[id]]))
+        return records
+
+    async def _push_loop(self) -> None:
+        interval = 1 / self.push_rate
+        while True:
+            await asyncio.sleep(interval)
+            remaining = self.push_updates
+            # Each update group carries at most 255 records.
+            while remaining > 0:
+                self.publish([(0x07, self._random_point_updates(min(remaining, 255)))])
+                remaining -= 255
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            self.publish([(0x00, [])])
+
+    def add_history_event(self, area: int, param: int) -> None:
+        date = datetime.now().replace(microsecond=0)
+        self.history.append((date, area, param))
+        id = len(self.history)
+        self.publish([(0x02, [self._subscription_event(id, date, area, param)])])
+
+    def _history_code(self) -> int:
+        # "Alarm" on B/G panels, "Zone Alarm" / "Burglary alarm" on Solution / AMAX panels.
+        return 19 if self.family == PANEL_FAMILY.BG_SERIES else 1
+
+    def _subscription_event(self, id: int, date: datetime, area: int, param: int) -> bytes:
+        if self.family == PANEL_FAMILY.BG_SERIES:
+            timestamp = (
+                date.minute
+                | date.hour << 6
+                | (date.day - 1) << 11
+                | (date.month - 1) << 16
+                | (date.year - 2010) << 20
+                | date.second << 26
+            )
+        else:
+            timestamp = (
+                date.minute
+                | date.hour << 6
+                | date.day << 11
+                | date.month << 16
+                | (date.year - 2000) << 20
+                | date.second << 26
+            )
+        text = b"emulated event"
+        event = bytearray((id - 1).to_bytes(4, "big"))
+        event += self._history_code().to_bytes(2, "big")
+        event += area.to_bytes(2, "big")
+        for p in (param, param, 0):
+            event += p.to_bytes(2, "big")
+        event += timestamp.to_bytes(4, "big")
+        event += bytes(5)
+        event += len(text).to_bytes(2, "big")
+        return bytes(event + text)
+
+    def _polled_event(self, date: datetime, area: int, param: int) -> bytes:
+        if self.family == PANEL_FAMILY.BG_SERIES:
+            timestamp = (
+                (date.year - 2010) << 26
+                | date.month << 22
+                | date.day << 17
+                | date.hour << 12
+                | date.minute << 6
+                | date.second
+            )
+            event = bytearray(self._history_code().to_bytes(2, "big"))
+            event += area.to_bytes(2, "big")
+            for p in (param, param, 0):
+                event += (p & 0xFFFF).to_bytes(2, "big")
+            event += timestamp.to_bytes(4, "big")
+            return bytes(event)
+        event = bytearray((date.minute | date.hour << 6 | date.day << 11).to_bytes(2, "little"))
+        event += (date.second | date.month << 6 | (date.year - 2000) << 10).to_bytes(2, "little")
+        event += area.to_bytes(2, "little")
+        event += bytes([self._history_code(), param & 0x1F])
+        return bytes(event)
+
+    def history_batch(self, event_id: int) -> bytes:
+        record_len = 14 if self.family == PANEL_FAMILY.BG_SERIES else 8
+        batch = (MAX_PAYLOAD - 5) // record_len
+        if event_id >= len(self.history):
+            # Reply with the id of the last written event, and no events.
+            return bytes([0]) + len(self.history).to_bytes(4, "big")
+        events = self.history[event_id : event_id + batch]
+        data = bytearray([len(events)])
+        data += event_id.to_bytes(4, "big")
+        for event in events:
+            data += self._polled_event(*event)
+        return bytes(data)
+
+
+class Session(asyncio.Protocol):
+    """A single client connection to the emulated panel."""
+
+    def __init__(self, panel: PanelEmulator) -> None:
+        self.panel = panel
+        self.subscribed = False
+        self.authenticated = False
+        self._transport: asyncio.Transport | None = None
+        self._buffer = bytearray()
+        self._ready_at = 0.0
+        self._handlers = {
+            CMD.WHAT_ARE_YOU: self._what_are_you,
+            CMD.AUTHENTICATE: self._authenticate,
+            CMD.LOGIN_REMOTE_USER: self._ack,
+            CMD.REQUEST_PANEL_SYSTEM_STATUS: self._panel_system_status,
+            CMD.REQUEST_PERMISSION_FOR_PANEL_ACTION: self._ack,
+            CMD.ALARM_MEMORY_SUMMARY: self._alarm_memory_summary,
+            CMD.ALARM_MEMORY_DETAIL: self._alarm_memory_detail,
+            CMD.REQUEST_RAW_HISTORY_EVENTS: self._history_events,
+            CMD.REQUEST_RAW_HISTORY_EVENTS_EXT: self._history_events,
+            CMD.REQUEST_CONFIGURED_AREAS: lambda _: DATA + _id_bitmask(list(panel.areas)),
+            CMD.AREA_STATUS: lambda data: self._entity_status(panel.areas, data, 2),
+            CMD.AREA_ARM: self._area_arm,
+            CMD.AREA_TEXT: lambda data: self._text(panel.areas, "Area", data, 2),
+            CMD.REQUEST_CONFIGURED_DOORS: lambda _: DATA + _id_bitmask(list(panel.doors)),
+            CMD.DOOR_STATUS: lambda data: self._entity_status(panel.doors, data, 1),
+            CMD.SET_DOOR_STATE: self._set_door_state,
+            CMD.DOOR_TEXT: lambda data: self._text(panel.doors, "Door", data, 1),
+            CMD.REQUEST_CONFIGURED_OUTPUTS: lambda _: DATA + _id_bitmask(list(panel.outputs)),
+            CMD.OUTPUT_STATUS: self._output_status,
+            CMD.SET_OUTPUT_STATE: self._set_output_state,
+            CMD.OUTPUT_TEXT: lambda data: self._text(panel.outputs, "Output", data, 1),
+            CMD.REQUEST_CONFIGURED_POINTS: lambda _: DATA + _id_bitmask(list(panel.points)),
+            CMD.POINT_STATUS: lambda data: self._entity_status(panel.points, data, 2),
+            CMD.POINT_TEXT: lambda data: self._text(panel.points, "Point", data, 2),
+            CMD.SET_SUBSCRIPTION: self._set_subscription,
+            CMD.PRODUCT_SERIAL: lambda _: DATA + panel.serial_number.to_bytes(6, "big"),
+            CMD.SET_DATE_TIME: self._ack,
+            CMD.REQUEST_DATE_TIME: self._date_time,
+        }
+
+    def connection_made(self, transport: asyncio.Transport) -> None:  # type: ignore
+        self._transport = transport
+        self.panel.sessions.append(self)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._transport = None
+        if self in self.panel.sessions:
+            self.panel.sessions.remove(self)
+
+    def close(self) -> None:
+        if self._transport:
+            self._transport.abort()
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        while len(self._buffer) >= 3:
+            if self._buffer[0] == PROTOCOL.EXTENDED:
+                header = 3
+                msg_len = int.from_bytes(self._buffer[1:3], "big")
+            else:
+                header = 2
+                msg_len = self._buffer[1]
+            if len(self._buffer) < header + msg_len:
+                break
+            code = self._buffer[header]
+            request = bytes(self._buffer[header + 1 : header + msg_len])
+            protocol = self._buffer[0]
+            del self._buffer[: header + msg_len]
+            self._respond(protocol, self._handle(code, request))
+
+    def push(self, data: bytes) -> None:
+        if self._transport:
+            self._transport.write(b"\x02" + len(data).to_bytes(2, "big") + data)
+
+    def _handle(self, code: int, request: bytes) -> bytes:
+        handler = self._handlers.get(code)
+        if not handler:
+            return NACK + b"\x07"  # Unsupported command
+        try:
+            return handler(request)
+        except Exception:
+            LOG.exception("Failed to handle command 0x%02x", code)
+            return NACK + b"\x05"  # Data out of range
+
+    def _respond(self, protocol: int, response: bytes) -> None:
+        if self.panel.drop_rate and random.random() < self.panel.drop_rate:
+            LOG.info("Dropping response %s", response.hex())
+            return
+        if protocol == PROTOCOL.EXTENDED:
+            frame = b"\x04" + len(response).to_bytes(2, "big") + response
+        else:
+            frame = b"\x01" + bytes([len(response)]) + response
+        if not self.panel.latency:
+            if self._transport:
+                self._transport.write(frame)
+            return
+        # Delay each response by the round-trip latency, preserving their order.
+        loop = asyncio.get_running_loop()
+        self._ready_at = max(self._ready_at, loop.time() + self.panel.latency)
+        loop.call_at(self._ready_at, self._write, frame)
+
+    def _write(self, frame: bytes) -> None:
+        if self._transport:
+            self._transport.write(frame)
+
+    def _ack(self, _: bytes) -> bytes:
+        return ACK
+
+    def _what_are_you(self, _: bytes) -> bytes:
+        data = bytearray(23)
+        data[0] = self.panel.model
+        data[5], data[6] = 1, 0  # protocol version
+        return DATA + data + self.panel.bitmask
+
+    def _authenticate(self, _: bytes) -> bytes:
+        limit = self.panel.max_connections
+        active = sum(1 for s in self.panel.sessions if s.authenticated)
+        if limit and active >= limit:
+            return DATA + b"\x02"  # Max Connections
+        self.authenticated = True
+        return DATA + b"\x01"
+
+    def _panel_system_status(self, _: bytes) -> bytes:
+        version, revision = self.panel.firmware_version
+        data = bytearray([version, revision, 0, 0, 0])
+        data += self.panel.faults.to_bytes(2, "big")
+        return DATA + data
+
+    def _alarm_memory_summary(self, _: bytes) -> bytes:
+        return DATA + bytes(20)
+
+    def _alarm_memory_detail(self, _: bytes) -> bytes:
+        return ACK
+
+    def _history_events(self, request: bytes) -> bytes:
+        return DATA + self.panel.history_batch(int.from_bytes(request[1:5], "big"))
+
+    def _entity_status(self, entities: dict[int, int], request: bytes, id_size: int) -> bytes:
+        data = bytearray()
+        for i in range(0, len(request), id_size):
+            id = int.from_bytes(request[i : i + id_size], "big")
+            data += request[i : i + id_size] + bytes([entities.get(id, 0)])
+        return DATA + data
+
+    def _text(self, entities: dict[int, int], prefix: str, request: bytes, id_size: int) -> bytes:
+        if len(request) == 4:
+            # CF03: return as many names after the given id as fit in one frame.
+            start = int.from_bytes(request[:2], "big")
+            data = bytearray()
+            for id in entities:
+                if id <= start:
+                    continue
+                record = id.to_bytes(2, "big") + f"{prefix} {id}".encode() + b"\x00"
+                if len(data) + len(record) > MAX_PAYLOAD:
+                    break
+                data += record
+            return DATA + data if data else ACK
+        id = int.from_bytes(request[:id_size], "big")
+        return DATA + f"{prefix} {id}".encode() + b"\x00"
+
+    def _area_arm(self, request: bytes) -> bytes:
+        status = ARM_TYPE_STATUS[request[0]]
+        records = []
+        for index, byte in enumerate(request[1:]):
+            for bit in range(8):
+                id = index * 8 + bit + 1
+                if byte & (0x80 >> bit) and id in self.panel.areas:
+                    self.panel.areas[id] = status
+                    records.append(id.to_bytes(2, "big") + bytes([status]))
+        self.panel.publish([(0x04, records)])
+        return ACK
+
+    def _output_status(self, _: bytes) -> bytes:
+        active = [id for id, s in self.panel.outputs.items() if s == OUTPUT_STATUS.ACTIVE]
+        return DATA + _id_bitmask(active) if active else ACK
+
+    def _set_output_state(self, request: bytes) -> bytes:
+        self.panel.outputs[request[0]] = request[1]
+        self.panel.publish([(0x06, [bytes([0, request[0], request[1]])])])
+        return ACK
+
+    def _set_door_state(self, request: bytes) -> bytes:
+        status = DOOR_ACTION_STATUS.get(request[1], DOOR_STATUS.LOCKED)
+        self.panel.doors[request[0]] = status
+        self.panel.publish([(0x08, [request[0].to_bytes(2, "big") + bytes([status])])])
+        return ACK
+
+    def _set_subscription(self, _: bytes) -> bytes:
+        self.subscribed = True
+        return ACK
+
+    def _date_time(self, _: bytes) -> bytes:
+        now = datetime.now()
+        return DATA + bytes([now.month, now.day, now.year - 2000, now.hour, now.minute])
+
+
+def server_ssl_context(certfile: str | None = None, keyfile: str | None = None) -> ssl.SSLContext:
+    """TLS context for the emulator, using a throwaway self-signed certificate by default."""
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    if certfile:
+        context.load_cert_chain(certfile, keyfile)
+        return context
+    with tempfile.TemporaryDirectory() as tmp:
+        cert, key = os.path.join(tmp, "cert.pem"), os.path.join(tmp, "key.pem")
+        subprocess.run(
+            [
+                "openssl",
+                "req",
+                "-x509",
+                "-newkey",
+                "rsa:2048",
+                "-nodes",
+                "-days",
+                "1",
+                "-subj",
+                "/CN=bosch-emulator",
+                "-keyout",
+                key,
+                "-out",
+                cert,
+            ],
+            check=True,
+            capture_output=True,
+        )
+        context.load_cert_chain(cert, key)
+    return context
+
+
+if __name__ == "__main__":
+    models = ", ".join(f"0x{m:02X} ({p.name})" for m, p in PANEL_MODELS.items())
+    cli_parser = argparse.ArgumentParser(description=__doc__)
+    cli_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    cli_parser.add_argument("--port", type=int, default=7700, help="port to listen on")
+    cli_parser.add_argument(
+        "--model", type=lambda v: int(v, 0), default=0xA7, help=f"panel model, one of: {models}"
+    )
+    cli_parser.add_argument("--areas", type=int, default=4, help="number of areas")
+    cli_parser.add_argument("--points", type=int, default=64, help="number of points")
+    cli_parser.add_argument("--outputs", type=int, default=8, help="number of outputs")
+    cli_parser.add_argument("--doors", type=int, default=2, help="number of doors (B/G only)")
+    cli_parser.add_argument("--history", type=int, default=100, help="stored history events")
+    cli_parser.add_argument("--latency", type=float, default=0.0, help="response delay in seconds")
+    cli_parser.add_argument("--push-rate", type=float, default=0.0, help="status frames per second")
+    cli_parser.add_argument("--push-updates", type=int, default=1, help="point updates per frame")
+    cli_parser.add_argument("--heartbeat", type=float, default=30.0, help="heartbeat interval")
+    cli_parser.add_argument("--max-connections", type=int, default=0, help="session limit")
+    cli_parser.add_argument("--drop-rate", type=float, default=0.0, help="responses to drop")
+    cli_parser.add_argument("--certfile", help="TLS certificate (self-signed if omitted)")
+    cli_parser.add_argument("--keyfile", help="TLS private key")
+    args = cli_parser.parse_args()
+
+    logging.basicConfig(stream=sys.stdout, format="%(levelname)s: %(message)s", level=logging.INFO)
+
+    async def main() -> None:
+        emulator = PanelEmulator(
+            model=args.model,
+            areas=args.areas,
+            points=args.points,
+            outputs=args.outputs,
+            doors=args.doors,
+            history_events=args.history,
+            latency=args.latency,
+            push_rate=args.push_rate,
+            push_updates=args.push_updates,
+            heartbeat=args.heartbeat,
+            max_connections=args.max_connections,
+            drop_rate=args.drop_rate,
+        )
+        port = await emulator.start(
+            args.host, args.port, server_ssl_context(args.certfile, args.keyfile)
+        )
+        LOG.info("Emulating %s on %s:%d", PANEL_MODELS[args.model].name, args.host, port)
+        await asyncio.Event().wait()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
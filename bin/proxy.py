@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""Shares one panel session between many Mode 2 clients."""
+
+import argparse
+import asyncio
+import logging
+import ssl
+import sys
+
+from bosch_alarm_mode2 import Panel
+from bosch_alarm_mode2.proxy import PanelProxy
+
+LOG = logging.getLogger(__name__)
+
+if __name__ == "__main__":
+    cli_parser = argparse.ArgumentParser(description=__doc__)
+    cli_parser.add_argument("panel_host", help="address of the panel")
+    cli_parser.add_argument("--panel-port", type=int, default=7700)
+    cli_parser.add_argument("--automation-code", help="automation code of the panel")
+    cli_parser.add_argument("--user-code", help="installer or user code of the panel")
+    cli_parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    cli_parser.add_argument("--port", type=int, default=7700, help="port to listen on")
+    cli_parser.add_argument(
+        "--client-automation-code",
+        help="automation code clients must use (default: the panel's codes)",
+    )
+    cli_parser.add_argument(
+        "--client-user-code", help="user code clients must use (default: the panel's codes)"
+    )
+    cli_parser.add_argument("--max-clients", type=int, default=0)
+    cli_parser.add_argument("--cache-ttl", type=float, default=1.0, help="status cache lifetime")
+    cli_parser.add_argument("--certfile", required=True, help="TLS certificate to serve")
+    cli_parser.add_argument("--keyfile", help="TLS private key, if not in the certificate file")
+    args = cli_parser.parse_args()
+
+    logging.basicConfig(stream=sys.stdout, format="%(levelname)s: %(message)s", level=logging.INFO)
+
+    ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+    ssl_context.load_cert_chain(args.certfile, args.keyfile)
+
+    async def main() -> None:
+        panel = Panel(args.panel_host, args.panel_port, args.automation_code, args.user_code)
+        await panel.connect()
+        proxy = PanelProxy(
+            panel,
+            automation_code=args.client_automation_code,
+            user_code=args.client_user_code,
+            max_clients=args.max_clients,
+            cache_ttl=args.cache_ttl,
+        )
+        port = await proxy.start(args.host, args.port, ssl_context)
+        LOG.info("Proxying %s on %s:%d", panel.model.name, args.host, port)
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await proxy.close()
+            await panel.disconnect()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -1 +1,2 @@
 from .panel import Panel as Panel
+from .manager import PanelManager as PanelManager
@@ -0,0 +1,87 @@
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Any
+
+LOG = logging.getLogger(__name__)
+
+# Serializes updates to cache files, which panels in the same process may share.
+_WRITE_LOCK = threading.Lock()
+
+
+class EntityCache:
+    """On-disk cache of the configured entities and their names.
+
+    Entries are keyed by panel identity (model, serial number and firmware
+    version), and a cached set of names is only used while the set of
+    configured ids reported by the panel is unchanged. Several panels can
+    share one file: each only loads and updates the entry for its own key.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._key: str | None = None
+        # The entry for _key.
+        self._entry: dict[str, Any] = {}
+        self._dirty = False
+
+    async def load(self, key: str) -> None:
+        self._key = key
+        self._entry = (await asyncio.to_thread(self._read)).get(key, {})
+        self._dirty = False
+
+    async def save(self) -> None:
+        if not self._dirty or self._key is None:
+            return
+        await asyncio.to_thread(self._update, self._key, dict(self._entry))
+        self._dirty = False
+
+    def names(self, type: str, enabled_ids: list[int]) -> dict[int, str] | None:
+        entry = self._entry.get(type)
+        if not entry or entry["ids"] != enabled_ids:
+            return None
+        LOG.debug("Using cached %s names", type)
+        return {int(id): name for id, name in entry["names"].items()}
+
+    def set_names(self, type: str, enabled_ids: list[int], names: dict[int, str]) -> None:
+        if self._key is None:
+            return
+        self._entry[type] = {"ids": enabled_ids, "names": names}
+        self._dirty = True
+
+    def _read(self) -> dict[str, Any]:
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as excp:
+            LOG.warning("Ignoring unreadable entity cache %s: %s", self._path, excp)
+            return {}
+
+    def _update(self, key: str, entry: dict[str, Any]) -> None:
+        # Merge into what is on disk now, so entries other panels saved since
+        # this one loaded are kept.
+        with _WRITE_LOCK:
+            data = self._read()
+            data[key] = entry
+            self._write(data)
+
+    def _write(self, data: dict[str, Any]) -> None:
+        # A temporary file of its own, so concurrent writers never share one.
+        directory, name = os.path.split(os.path.abspath(self._path))
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=name + ".", suffix=".tmp", dir=directory)
+            with os.fdopen(fd, "w") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self._path)
+        except OSError as excp:
+            LOG.warning("Failed to write entity cache %s: %s", self._path, excp)
+            if tmp_path:
+                with contextlib.suppress(OSError):
+                    os.unlink(tmp_path)
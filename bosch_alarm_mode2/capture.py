@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import struct
+import time
+from collections.abc import Iterator
+from typing import Any, BinaryIO, NamedTuple
+
+from .const import CMD, PROTOCOL
+
+LOG = logging.getLogger(__name__)
+
+MAGIC = b"BM2CAP\x01"
+
+# Record header: direction, nanoseconds since the capture started, data length.
+RECORD = struct.Struct(">BQI")
+
+# Commands whose data is a passcode. It is zeroed in captures, so replays
+# can only tell these commands apart by their code.
+SECRET_COMMANDS = frozenset({CMD.AUTHENTICATE, CMD.LOGIN_REMOTE_USER})
+
+
+class DIRECTION:
+    # Bytes received from the panel.
+    INBOUND = 0
+    # Bytes written to the panel.
+    OUTBOUND = 1
+    # A new session was established; carries no data.
+    CONNECTED = 2
+
+
+class CaptureRecord(NamedTuple):
+    direction: int
+    time: float
+    data: bytes
+
+
+class CaptureWriter:
+    """Writes the raw traffic of one or more sessions to a capture file.
+
+    Inbound data is recorded as it was received, in whatever chunks the
+    transport delivered it, so a replay exercises the same framing code.
+    Outbound data is recorded one request at a time, with passcodes zeroed.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._file: BinaryIO | None = open(path, "wb")
+        self._file.write(MAGIC)
+        self._start_ns = time.monotonic_ns()
+
+    def record(self, direction: int, data: bytes = b"") -> None:
+        if self._file:
+            if direction == DIRECTION.OUTBOUND and _secret_command(data) is not None:
+                header = _request_header(data)
+                data = data[:header] + bytes(len(data) - header)
+            self._file.write(
+                RECORD.pack(direction, time.monotonic_ns() - self._start_ns, len(data)) + data
+            )
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+def read_capture(path: str) -> Iterator[CaptureRecord]:
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a capture file")
+        while header := file.read(RECORD.size):
+            if len(header) < RECORD.size:
+                # The capture was cut short while a record was being written.
+                return
+            direction, time_ns, length = RECORD.unpack(header)
+            data = file.read(length)
+            if len(data) < length:
+                return
+            yield CaptureRecord(direction, time_ns / 1e9, data)
+
+
+class ReplayTransport(asyncio.Transport):
+    """Plays back one captured session to a protocol, in place of a panel.
+
+    Inbound data is fed to protocol.data_received, either at the recorded pace
+    scaled by speed, or as fast as possible if speed is None. Either way, data
+    that followed a command in the capture is held back until the protocol has
+    written that command, so that responses line up with their commands.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        protocol: asyncio.Protocol,
+        speed: float | None = None,
+        session: int = 0,
+        write_timeout: float = 10.0,
+    ) -> None:
+        super().__init__()
+        self._records = _session_records(path, session)
+        self._protocol = protocol
+        self._speed = speed
+        self._write_timeout = write_timeout
+        self._writes = 0
+        self._written = asyncio.Event()
+        self._closing = False
+        self._expected = [r.data for r in self._records if r.direction == DIRECTION.OUTBOUND]
+        self.mismatched_writes = 0
+        protocol.connection_made(self)
+
+    async def play(self) -> None:
+        """Play back the session; the protocol stays connected once it ends."""
+        loop = asyncio.get_running_loop()
+        start_t = loop.time()
+        outbound = 0
+        for record in self._records:
+            if self._closing:
+                return
+            if self._speed:
+                delay = start_t + record.time / self._speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            if record.direction == DIRECTION.OUTBOUND:
+                outbound += 1
+                await self._wait_for_write(outbound)
+            else:
+                self._protocol.data_received(record.data)
+
+    async def _wait_for_write(self, count: int) -> None:
+        while self._writes < count and not self._closing:
+            self._written.clear()
+            try:
+                await asyncio.wait_for(self._written.wait(), self._write_timeout)
+            except asyncio.TimeoutError:
+                LOG.warning("Replay diverged: command %d was never sent, continuing", count)
+                return
+
+    def write(self, data: bytes | bytearray | memoryview) -> None:  # type: ignore[override]
+        if self._writes < len(self._expected) and not _same_request(
+            self._expected[self._writes], bytes(data)
+        ):
+            self.mismatched_writes += 1
+            LOG.debug(
+                "Replay diverged: %s sent instead of %s",
+                bytes(data).hex(),
+                self._expected[self._writes].hex(),
+            )
+        self._writes += 1
+        self._written.set()
+
+    def is_closing(self) -> bool:
+        return self._closing
+
+    def close(self) -> None:
+        if not self._closing:
+            self._closing = True
+            self._written.set()
+            asyncio.get_running_loop().call_soon(self._protocol.connection_lost, None)
+
+    def abort(self) -> None:
+        self.close()
+
+    def get_extra_info(self, name: str, default: Any = None) -> Any:
+        return default
+
+
+def _request_header(request: bytes) -> int:
+    # The length of the protocol, length and command code bytes.
+    return 4 if request[0] == PROTOCOL.EXTENDED else 3
+
+
+def _secret_command(request: bytes) -> int | None:
+    header = _request_header(request)
+    if len(request) < header:
+        return None
+    code = request[header - 1]
+    return code if code in SECRET_COMMANDS else None
+
+
+def _same_request(expected: bytes, request: bytes) -> bool:
+    # Passcodes were not captured, so only their commands are compared.
+    code = _secret_command(expected)
+    if code is not None:
+        return code == _secret_command(request)
+    return expected == request
+
+
+def _session_records(path: str, session: int) -> list[CaptureRecord]:
+    records = []
+    current = -1
+    start = 0.0
+    for record in read_capture(path):
+        if record.direction == DIRECTION.CONNECTED:
+            current += 1
+            if current > session:
+                break
+            start = record.time
+        elif current == session:
+            records.append(record._replace(time=record.time - start))
+    if current < session:
+        raise ValueError(f"{path} holds no session {session}")
+    return records
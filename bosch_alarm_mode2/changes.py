@@ -0,0 +1,154 @@
+import asyncio
+from collections import deque
+from collections.abc import Callable, Generator
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Generic, NamedTuple, TypeVar
+
+
+C = TypeVar("C", bound=tuple[Any, ...])
+
+
+class EntityChange(NamedTuple):
+    """A transition of one attribute of an area, point, door or output.
+
+    attribute is "status" for all entities. Areas also report "ready", as a
+    (ready status, faults) tuple, and "alarms", as a sorted tuple of priorities.
+    time is when the client observed the transition.
+    """
+
+    entity_type: str
+    entity_id: int
+    attribute: str
+    old: Any
+    new: Any
+    time: datetime
+
+
+class ChangeBatcher:
+    """Delivers entity changes to listeners as change sets.
+
+    Changes recorded inside batch() are held back and delivered as a single
+    list once the outermost batch ends; changes outside a batch are delivered
+    as they happen.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: list[Callable[[list[EntityChange]], None]] = []
+        self._pending: list[EntityChange] = []
+        self._depth = 0
+
+    def attach(self, listener: Callable[[list[EntityChange]], None]) -> None:
+        self._listeners.append(listener)
+
+    def detach(self, listener: Callable[[list[EntityChange]], None]) -> None:
+        self._listeners.remove(listener)
+
+    @property
+    def has_listeners(self) -> bool:
+        # Lets callers skip building changes nobody will receive.
+        return bool(self._listeners)
+
+    def record(self, change: EntityChange) -> None:
+        if not self._listeners:
+            return
+        self._pending.append(change)
+        if not self._depth:
+            self._flush()
+
+    @contextmanager
+    def batch(self) -> Generator[None, None, None]:
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            if not self._depth:
+                self._flush()
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        changes, self._pending = self._pending, []
+        for listener in self._listeners:
+            listener(changes)
+
+
+class OVERFLOW:
+    # Discard the oldest queued change.
+    DROP_OLDEST = "drop_oldest"
+    # Merge into the queued change for the same entity attribute, if there is
+    # one, and otherwise discard the oldest queued change.
+    COALESCE = "coalesce"
+
+
+class ChangeStream(Generic[C]):
+    """A bounded queue of entity changes, consumed with async for.
+
+    Changes are queued by put(), which never blocks, so a slow consumer can
+    not hold up the connection. When the queue is full, the overflow policy
+    decides what is lost; dropped counts the changes lost so far.
+
+    Changes are named tuples ending in old, new and time (EntityChange, or
+    PanelChange for a PanelManager); the fields before those identify the
+    entity attribute when coalescing.
+    """
+
+    def __init__(self, maxsize: int = 1000, overflow: str = OVERFLOW.DROP_OLDEST) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        if overflow not in (OVERFLOW.DROP_OLDEST, OVERFLOW.COALESCE):
+            raise ValueError(f"unknown overflow policy {overflow}")
+        self._maxsize = maxsize
+        self._overflow = overflow
+        self._queue: deque[C] = deque()
+        self._waiter: asyncio.Future[None] | None = None
+        self._closed = False
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, changes: list[C]) -> None:
+        if self._closed:
+            return
+        for change in changes:
+            if len(self._queue) >= self._maxsize:
+                self.dropped += 1
+                if self._overflow == OVERFLOW.COALESCE and self._coalesce(change):
+                    continue
+                self._queue.popleft()
+            self._queue.append(change)
+        self._wake()
+
+    def close(self) -> None:
+        """End the stream once the queued changes are consumed."""
+        self._closed = True
+        self._wake()
+
+    def __aiter__(self) -> "ChangeStream[C]":
+        return self
+
+    async def __anext__(self) -> C:
+        while not self._queue:
+            if self._closed:
+                raise StopAsyncIteration
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._queue.popleft()
+
+    def _coalesce(self, change: C) -> bool:
+        key = change[:-3]
+        for i in range(len(self._queue) - 1, -1, -1):
+            queued = self._queue[i]
+            if queued[:-3] == key:
+                self._queue[i] = change._replace(old=queued[-3])  # type: ignore[attr-defined]
+                return True
+        return False
+
+    def _wake(self) -> None:
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
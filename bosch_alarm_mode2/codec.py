@@ -0,0 +1,77 @@
+"""Precompiled readers and writers for Mode 2 payloads.
+
+Readers unpack fields in place at an offset, so parsing a response or a
+status frame never copies it.
+"""
+
+import struct
+from collections.abc import Iterable, Sequence
+
+from .const import PROTOCOL
+
+Buffer = bytes | bytearray | memoryview
+
+BE16 = struct.Struct(">H")
+BE32 = struct.Struct(">I")
+LE16 = struct.Struct("<H")
+
+_REQUEST_HEADER = struct.Struct(">BBB")
+_EXTENDED_REQUEST_HEADER = struct.Struct(">BHB")
+_HISTORY_REQUEST = struct.Struct(">BI")
+_ALARM_DETAIL_REQUEST = struct.Struct(">BHH")
+_STATE_REQUEST = struct.Struct(">BB")
+
+
+def be16(data: Buffer, offset: int = 0) -> int:
+    return BE16.unpack_from(data, offset)[0]
+
+
+def be32(data: Buffer, offset: int = 0) -> int:
+    return BE32.unpack_from(data, offset)[0]
+
+
+def le16(data: Buffer, offset: int = 0) -> int:
+    return LE16.unpack_from(data, offset)[0]
+
+
+def encode_request(protocol: int, code: int, data: Buffer) -> bytes:
+    header = _EXTENDED_REQUEST_HEADER if protocol == PROTOCOL.EXTENDED else _REQUEST_HEADER
+    return header.pack(protocol, len(data) + 1, code) + data
+
+
+def encode_ids(ids: Sequence[int], id_size: int = 2) -> bytes:
+    if id_size == 1:
+        return bytes(ids)
+    return struct.pack(">%dH" % len(ids), *ids)
+
+
+def encode_text_request(id: int, id_size: int = 2, many: bool = False) -> bytes:
+    # Always requests the primary language.
+    request = encode_ids((id,), id_size) + b"\x00"
+    return request + b"\x01" if many else request
+
+
+def encode_history_request(event_id: int) -> bytes:
+    return _HISTORY_REQUEST.pack(0xFF, event_id)
+
+
+def encode_alarm_detail_request(
+    priority: int, last_area: int | None = None, last_point: int | None = None
+) -> bytes:
+    if last_area and last_point:
+        return _ALARM_DETAIL_REQUEST.pack(priority, last_area, last_point)
+    return bytes((priority,))
+
+
+def encode_state_request(id: int, state: int) -> bytes:
+    return _STATE_REQUEST.pack(id, state)
+
+
+def encode_area_arm(area_id: int, arm_type: int) -> bytes:
+    # bitmask with only i-th bit from the left being 1 (section 3.1.4)
+    index = area_id - 1
+    return bytes((arm_type, *(0,) * (index // 8), 1 << (7 - index % 8)))
+
+
+def encode_subscription(format: int, subscriptions: Iterable[bool]) -> bytes:
+    return bytes((format, *subscriptions))
@@ -2,27 +2,86 @@ import asyncio
 from collections.abc import Callable
 import logging
 import binascii
+import time
 from datetime import datetime
 
 from collections import deque
 
-from .const import ERROR, PROTOCOL
-from .utils import BE_INT
+from .capture import DIRECTION, CaptureWriter
+from .const import CMD, ERROR, PROTOCOL
+from .codec import be16, encode_request
+from .metrics import ConnectionMetrics
 
 LOG = logging.getLogger(__name__)
 
+# Consumed bytes are only discarded from the receive buffer once this many
+# have accumulated, or once everything received so far has been consumed.
+COMPACT_THRESHOLD = 64 * 1024
+
+# Seconds to wait for the response to a command, by command code. Commands
+# that make the panel act, or return a lot of data, are given longer.
+DEFAULT_COMMAND_TIMEOUT = 10.0
+COMMAND_TIMEOUTS = {
+    CMD.AREA_ARM: 30.0,
+    CMD.SET_OUTPUT_STATE: 30.0,
+    CMD.SET_DOOR_STATE: 30.0,
+    CMD.REQUEST_RAW_HISTORY_EVENTS: 30.0,
+    CMD.REQUEST_RAW_HISTORY_EVENTS_EXT: 30.0,
+    CMD.AUTHENTICATE: 30.0,
+    CMD.LOGIN_REMOTE_USER: 30.0,
+}
+# Seconds to wait for the panel to answer each probe after a timeout, and
+# the number of probes sent before giving up on the session.
+RESYNC_TIMEOUT = 5.0
+RESYNC_ATTEMPTS = 3
+# The area that resynchronization probes request the status of. Every panel
+# has area 1.
+PROBE_AREA = b"\x00\x01"
+
+
+class NackError(Exception):
+    """The panel rejected a command; code is one of the ERROR codes."""
+
+    def __init__(self, code: int) -> None:
+        super().__init__("NACK: ", ERROR.get(code, hex(code)))
+        self.code = code
+
+
+class CommandTimeoutError(TimeoutError):
+    """The panel did not respond to a command in time."""
+
+    def __init__(self, code: int, timeout: float) -> None:
+        super().__init__(f"No response to command 0x{code:02X} within {timeout}s")
+        self.code = code
+
 
 class Connection(asyncio.Protocol):
     def __init__(
-        self, on_status_update: Callable[[bytearray], None], on_disconnect: Callable[[], None]
+        self,
+        on_status_update: Callable[[memoryview], None],
+        on_disconnect: Callable[[], None],
+        metrics: ConnectionMetrics | None = None,
+        capture: CaptureWriter | None = None,
     ) -> None:
         self.protocol = PROTOCOL.BASIC
+        self.metrics = metrics or ConnectionMetrics()
+        # Records all traffic while set.
+        self.capture = capture
         self._on_status_update = on_status_update
         self._on_disconnect = on_disconnect
         self._transport: asyncio.Transport | None = None
         self._buffer = bytearray()
+        # Start of the unconsumed data in _buffer.
+        self._buffer_pos = 0
         self._pending: deque[asyncio.Future[bytearray]] = deque()
         self._pending_last_empty = datetime.now()
+        self.command_timeouts = dict(COMMAND_TIMEOUTS)
+        self.default_command_timeout = DEFAULT_COMMAND_TIMEOUT
+        # Set while the responses are being resynchronized after a timeout.
+        self._resync: asyncio.Future[None] | None = None
+        self._probe: asyncio.Future[None] | None = None
+        # How many times the current probe repeats PROBE_AREA.
+        self._probe_ids = 0
         self.set_max_commands_in_flight(1)
 
     def set_max_commands_in_flight(self, command_count: int) -> None:
@@ -31,32 +90,141 @@ class Connection(asyncio.Protocol):
     def connection_made(self, transport: asyncio.Transport) -> None:  # type: ignore
         LOG.info("Connection established.")
         self._transport = transport
+        self.metrics.connects += 1
+        if self.capture:
+            self.capture.record(DIRECTION.CONNECTED)
 
     def connection_lost(self, exc: Exception | None) -> None:
         LOG.info("Connection terminated.")
+        self._transport = None
+        # Don't leave callers waiting for responses that will never come.
+        pending, self._pending = self._pending, deque()
+        self.metrics.pending = 0
+        for response in pending:
+            if not response.done():
+                response.set_exception(ConnectionError("Connection terminated"))
         self._on_disconnect()
 
     def data_received(self, data: bytes) -> None:
-        LOG.debug("<< %s", binascii.hexlify(data))
-        self._buffer += data
+        if LOG.isEnabledFor(logging.DEBUG):
+            LOG.debug("<< %s", binascii.hexlify(data))
+        self.metrics.bytes_in += len(data)
+        if self.capture:
+            self.capture.record(DIRECTION.INBOUND, data)
+        try:
+            self._buffer += data
+        except BufferError:
+            # A callback is still holding on to a view of the old buffer.
+            self._buffer = self._buffer[self._buffer_pos :] + data
+            self._buffer_pos = 0
         self._consume_buffer()
+        self._compact_buffer()
 
-    async def send_command(self, code: int, data: bytes = bytearray()) -> bytearray:
+    async def send_command(
+        self, code: int, data: bytes = bytearray(), on_sent: Callable[[], None] | None = None
+    ) -> bytearray:
         if not self._transport:
             raise asyncio.InvalidStateError("Transport not connected")
         # Some panels don't like receiving multiple commands at once
         # so we limit the amount of commands that are in flight at a given time
+        metrics = self.metrics
+        queued_t = time.perf_counter()
         async with self._command_semaphore:
-            request = bytearray([self.protocol])
-            length_size = 2 if self.protocol == PROTOCOL.EXTENDED else 1
-            request.extend((len(data) + 1).to_bytes(length_size, "big"))
-            request.append(code)
-            request.extend(data)
-            LOG.debug(">> %s", binascii.hexlify(request))
+            metrics.semaphore_wait.observe(time.perf_counter() - queued_t)
+            while self._resync:
+                await asyncio.shield(self._resync)
+            if not self._transport:
+                raise asyncio.InvalidStateError("Transport not connected")
+            request = encode_request(self.protocol, code, data)
+            if LOG.isEnabledFor(logging.DEBUG):
+                LOG.debug(">> %s", binascii.hexlify(request))
             response: asyncio.Future[bytearray] = asyncio.get_running_loop().create_future()
             self._pending.append(response)
-            self._transport.write(request)
-            return await response
+            self._write(request)
+            sent_t = time.perf_counter()
+            metrics.commands += 1
+            metrics.bytes_out += len(request)
+            metrics.pending = len(self._pending)
+            if metrics.pending > metrics.max_pending:
+                metrics.max_pending = metrics.pending
+            if on_sent:
+                on_sent()
+            timeout = self.command_timeouts.get(code, self.default_command_timeout)
+            try:
+                return await asyncio.wait_for(asyncio.shield(response), timeout)
+            except asyncio.TimeoutError:
+                if response.done():
+                    return response.result()
+                metrics.timeouts += 1
+                LOG.warning(
+                    "No response to command 0x%02X in %.1fs, resynchronizing", code, timeout
+                )
+                response.cancel()
+                self._start_resync()
+                raise CommandTimeoutError(code, timeout) from None
+            except asyncio.CancelledError:
+                # Nobody is left to retrieve the response, or the error the
+                # connection fails it with once it is lost.
+                response.cancel()
+                raise
+            finally:
+                # Responses to NACKs count too, but abandoned commands don't.
+                if response.done() and not response.cancelled():
+                    metrics.command_latency(code).observe(time.perf_counter() - sent_t)
+
+    def _start_resync(self) -> None:
+        if self._resync:
+            return
+        self._resync = asyncio.get_running_loop().create_future()
+        asyncio.create_task(self._resync_responses())
+
+    async def _resync_responses(self) -> None:
+        # The panel may have dropped a response, or may still send it, and there
+        # is no way to tell which response belongs to which command. So fail all
+        # outstanding commands, and discard responses until the response to a
+        # probe arrives; anything after it is in step again.
+        # The probe requests the status of PROBE_AREA a different number of
+        # times on each attempt, and the panel echoes the ids it was asked for.
+        # No other command asks for that, so neither late responses to other
+        # commands nor those to earlier probes can be mistaken for the reply.
+        assert self._resync
+        self.metrics.resyncs += 1
+        pending, self._pending = self._pending, deque()
+        self.metrics.pending = 0
+        for response in pending:
+            if not response.done():
+                response.set_exception(
+                    asyncio.InvalidStateError("Command abandoned while resynchronizing")
+                )
+        try:
+            for attempt in range(RESYNC_ATTEMPTS):
+                if not self._transport:
+                    return
+                self._probe = asyncio.get_running_loop().create_future()
+                self._probe_ids = attempt + 2
+                self._write(
+                    encode_request(self.protocol, CMD.AREA_STATUS, PROBE_AREA * self._probe_ids)
+                )
+                try:
+                    await asyncio.wait_for(self._probe, RESYNC_TIMEOUT)
+                except asyncio.TimeoutError:
+                    LOG.info("No response to resynchronization probe %d", attempt + 1)
+                    continue
+                LOG.info("Resynchronized responses after %d abandoned commands", len(pending))
+                return
+            LOG.warning("No response to resynchronization probes: resetting connection.")
+            self.close()
+        finally:
+            self._probe = None
+            self._pending_last_empty = datetime.now()
+            self._resync.set_result(None)
+            self._resync = None
+
+    def _write(self, data: bytes) -> None:
+        assert self._transport
+        if self.capture:
+            self.capture.record(DIRECTION.OUTBOUND, data)
+        self._transport.write(data)
 
     def close(self) -> None:
         if self._transport:
@@ -68,36 +236,78 @@ class Connection(asyncio.Protocol):
         return self._pending_last_empty if len(self._pending) else datetime.now()
 
     def _consume_buffer(self) -> None:
-        while self._buffer:
-            msg_len = 0
-            if self._buffer[0] == 0x01:
-                msg_len = self._buffer[1] + 2
-                if len(self._buffer) < msg_len:
-                    break
-                self._process_response(self._buffer[2:msg_len])
-            elif self._buffer[0] == 0x02:
-                msg_len = BE_INT.int16(self._buffer, 1) + 3
-                if len(self._buffer) < msg_len:
-                    break
-                self._on_status_update(self._buffer[3:msg_len])
-            elif self._buffer[0] == 0x04:
-                msg_len = BE_INT.int16(self._buffer, 1) + 3
-                if len(self._buffer) < msg_len:
-                    break
-                self._process_response(self._buffer[3:msg_len])
-            else:
-                raise RuntimeError("unknown protocol " + str(self._buffer))
-            self._buffer = self._buffer[msg_len:]
-
-    def _process_response(self, data: bytearray) -> None:
+        # Frames are handed out as views into the receive buffer rather than
+        # copies; they are only valid for the duration of the callback.
+        with memoryview(self._buffer) as buffer:
+            end = len(buffer)
+            pos = self._buffer_pos
+            while pos < end:
+                available = end - pos
+                if buffer[pos] == 0x01:
+                    if available < 2:
+                        break
+                    msg_len = buffer[pos + 1] + 2
+                    if available < msg_len:
+                        break
+                    self._process_response(buffer[pos + 2 : pos + msg_len])
+                elif buffer[pos] == 0x02:
+                    if available < 3:
+                        break
+                    msg_len = be16(buffer, pos + 1) + 3
+                    if available < msg_len:
+                        break
+                    self.metrics.status_frames += 1
+                    self._on_status_update(buffer[pos + 3 : pos + msg_len])
+                elif buffer[pos] == 0x04:
+                    if available < 3:
+                        break
+                    msg_len = be16(buffer, pos + 1) + 3
+                    if available < msg_len:
+                        break
+                    self._process_response(buffer[pos + 3 : pos + msg_len])
+                else:
+                    raise RuntimeError("unknown protocol " + str(bytes(buffer[pos:])))
+                pos += msg_len
+                self._buffer_pos = pos
+
+    def _compact_buffer(self) -> None:
+        if self._buffer_pos != len(self._buffer) and self._buffer_pos < COMPACT_THRESHOLD:
+            return
+        try:
+            del self._buffer[: self._buffer_pos]
+        except BufferError:
+            self._buffer = self._buffer[self._buffer_pos :]
+        self._buffer_pos = 0
+
+    def _process_response(self, data: memoryview) -> None:
+        self.metrics.responses += 1
+        if self._probe:
+            # Discard everything up to the response to the latest probe.
+            if self._is_probe_response(data) and not self._probe.done():
+                self._probe.set_result(None)
+            return
+        if not self._pending:
+            LOG.debug("Discarding unexpected response: %s", binascii.hexlify(data))
+            return
         response = self._pending.popleft()
+        self.metrics.pending = len(self._pending)
         if len(self._pending) == 0:
             self._pending_last_empty = datetime.now()
+        if response.done():
+            # The caller gave up on it.
+            return
         if data[0] == 0xFC:
             response.set_result(bytearray())
         elif data[0] == 0xFD:
-            response.set_exception(Exception("NACK: ", ERROR[data[1]]))
+            response.set_exception(NackError(data[1]))
         elif data[0] == 0xFE:
-            response.set_result(data[1:])
+            # The result outlives the receive buffer, so it has to be copied.
+            response.set_result(bytearray(data[1:]))
         else:
-            response.set_exception(Exception("unexpected response code:", data))
+            response.set_exception(Exception("unexpected response code:", bytes(data)))
+
+    def _is_probe_response(self, data: memoryview) -> bool:
+        # An area status, with an id and a status byte for each requested id.
+        if len(data) != 1 + 3 * self._probe_ids or data[0] != 0xFE:
+            return False
+        return all(data[pos : pos + 2] == PROBE_AREA for pos in range(1, len(data), 3))
@@ -302,6 +302,32 @@ CMD_REQUEST_MAX = {
     CMD.POINT_STATUS: 66,
 }
 
+# Reads without side effects: concurrent identical requests can share a response.
+CMD_IDEMPOTENT = frozenset(
+    {
+        CMD.WHAT_ARE_YOU,
+        CMD.REQUEST_PANEL_SYSTEM_STATUS,
+        CMD.ALARM_MEMORY_SUMMARY,
+        CMD.ALARM_MEMORY_DETAIL,
+        CMD.REQUEST_RAW_HISTORY_EVENTS,
+        CMD.REQUEST_RAW_HISTORY_EVENTS_EXT,
+        CMD.REQUEST_CONFIGURED_AREAS,
+        CMD.AREA_STATUS,
+        CMD.AREA_TEXT,
+        CMD.REQUEST_CONFIGURED_DOORS,
+        CMD.DOOR_STATUS,
+        CMD.DOOR_TEXT,
+        CMD.REQUEST_CONFIGURED_OUTPUTS,
+        CMD.OUTPUT_STATUS,
+        CMD.OUTPUT_TEXT,
+        CMD.REQUEST_CONFIGURED_POINTS,
+        CMD.POINT_STATUS,
+        CMD.POINT_TEXT,
+        CMD.PRODUCT_SERIAL,
+        CMD.REQUEST_DATE_TIME,
+    }
+)
+
 
 class PROTOCOL:
     BASIC = 0x01
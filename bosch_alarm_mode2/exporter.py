@@ -0,0 +1,232 @@
+import asyncio
+import logging
+import math
+from collections.abc import Mapping
+from datetime import datetime
+
+from .const import AREA_STATUS, CMD, DOOR_STATUS, OUTPUT_STATUS, POINT_STATUS
+from .metrics import LATENCY_BUCKETS, Histogram
+from .panel import Panel, PanelEntity
+
+LOG = logging.getLogger(__name__)
+
+COMMAND_NAMES = {code: name.lower() for name, code in vars(CMD).items() if not name.startswith("_")}
+
+ENTITY_STATUS_TEXT = {
+    "area": AREA_STATUS.TEXT,
+    "point": POINT_STATUS.TEXT,
+    "output": OUTPUT_STATUS.TEXT,
+    "door": DOOR_STATUS.TEXT,
+}
+
+
+class MetricsExporter:
+    """Serves the health of a set of panels over HTTP, in the Prometheus text format.
+
+    Everything is read when /metrics is scraped, so the exporter costs nothing
+    while panels process traffic. panels may be PanelManager.panels, in which
+    case panels added later are exported too.
+    """
+
+    def __init__(self, panels: Mapping[str, Panel]) -> None:
+        self.panels = panels
+        self._server: asyncio.Server | None = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 9100) -> int:
+        """Start serving, and return the port that is listened on."""
+        self._server = await asyncio.start_server(self._serve, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def render(self) -> str:
+        lines: list[str] = []
+        families: dict[str, list[str]] = {}
+
+        def add(name: str, type: str, help: str, labels: str, value: float) -> None:
+            if name not in families:
+                families[name] = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+            families[name].append(f"{name}{{{labels}}} {_format(value)}")
+
+        def add_histogram(name: str, help: str, labels: str, histogram: Histogram) -> None:
+            if name not in families:
+                families[name] = [f"# HELP {name} {help}", f"# TYPE {name} histogram"]
+            samples = families[name]
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, histogram.counts):
+                cumulative += count
+                samples.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            samples.append(f'{name}_bucket{{{labels},le="+Inf"}} {histogram.count}')
+            samples.append(f"{name}_sum{{{labels}}} {_format(histogram.sum)}")
+            samples.append(f"{name}_count{{{labels}}} {histogram.count}")
+
+        now = datetime.now()
+        for panel_name, panel in self.panels.items():
+            labels = f'panel="{_escape(panel_name)}"'
+            metrics = panel.metrics
+            add(
+                "bosch_panel_connected",
+                "gauge",
+                "Whether the panel is connected and loaded.",
+                labels,
+                panel.connection_status(),
+            )
+            add(
+                "bosch_panel_connects_total",
+                "counter",
+                "Sessions established with the panel.",
+                labels,
+                metrics.connects,
+            )
+            last_msg = panel._last_msg
+            add(
+                "bosch_panel_tls_resumptions_total",
+                "counter",
+                "Connections that resumed a previous TLS session.",
+                labels,
+                metrics.tls_resumptions,
+            )
+            add(
+                "bosch_panel_heartbeat_age_seconds",
+                "gauge",
+                "Time since the panel was last heard from.",
+                labels,
+                (now - last_msg).total_seconds() if last_msg else math.nan,
+            )
+            add(
+                "bosch_panel_pending_commands",
+                "gauge",
+                "Commands sent and waiting for a response.",
+                labels,
+                metrics.pending,
+            )
+            add(
+                "bosch_panel_max_pending_commands",
+                "gauge",
+                "Most commands ever waiting for a response at once.",
+                labels,
+                metrics.max_pending,
+            )
+            for counter, help in (
+                ("commands", "Commands sent."),
+                ("timeouts", "Commands that timed out."),
+                ("resyncs", "Response resynchronizations after a timeout."),
+                ("responses", "Responses received."),
+                ("status_frames", "Status frames received."),
+                ("bytes_in", "Bytes received."),
+                ("bytes_out", "Bytes sent."),
+            ):
+                add(
+                    f"bosch_panel_{counter}_total",
+                    "counter",
+                    help,
+                    labels,
+                    getattr(metrics, counter),
+                )
+            for code, histogram in sorted(metrics.latency.items()):
+                command = COMMAND_NAMES.get(code, f"0x{code:02x}")
+                add_histogram(
+                    "bosch_panel_command_latency_seconds",
+                    "Round-trip time of commands.",
+                    f'{labels},command="{command}"',
+                    histogram,
+                )
+            add_histogram(
+                "bosch_panel_command_queue_seconds",
+                "Time commands waited to be sent.",
+                labels,
+                metrics.semaphore_wait,
+            )
+            add_histogram(
+                "bosch_panel_handshake_seconds",
+                "Time to establish connections, including the TLS handshake.",
+                labels,
+                metrics.handshake,
+            )
+            add_histogram(
+                "bosch_panel_reconnect_seconds",
+                "Time from losing the connection to being loaded again.",
+                labels,
+                metrics.reconnect,
+            )
+            add(
+                "bosch_panel_history_events_total",
+                "counter",
+                "History events received.",
+                labels,
+                panel._history.total_events,
+            )
+            add(
+                "bosch_panel_history_events",
+                "gauge",
+                "History events kept in memory.",
+                labels,
+                len(panel._history),
+            )
+            for entity_type, entities in (
+                ("area", panel.areas),
+                ("point", panel.points),
+                ("output", panel.outputs),
+                ("door", panel.doors),
+            ):
+                for status, count in _count_by_status(entities).items():
+                    text = ENTITY_STATUS_TEXT[entity_type].get(status, str(status))
+                    add(
+                        "bosch_panel_entities",
+                        "gauge",
+                        "Configured entities by type and status.",
+                        f'{labels},type="{entity_type}",status="{_escape(text)}"',
+                        count,
+                    )
+
+        for samples in families.values():
+            lines.extend(samples)
+        lines.append("")
+        return "\n".join(lines)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request = await asyncio.wait_for(reader.readline(), timeout=10)
+            # Skip the headers.
+            while (await asyncio.wait_for(reader.readline(), timeout=10)).strip():
+                pass
+            parts = request.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?")[0] == "/metrics":
+                body = self.render().encode()
+                status = "200 OK"
+                content_type = "text/plain; version=0.0.4; charset=utf-8"
+            else:
+                body = b"Not found\n"
+                status = "404 Not Found"
+                content_type = "text/plain"
+            writer.write(
+                f"HTTP/1.0 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as excp:
+            LOG.debug("Metrics request failed: %s", excp)
+        finally:
+            writer.close()
+
+
+def _count_by_status(entities: Mapping[int, PanelEntity]) -> dict[int, int]:
+    counts: dict[int, int] = {}
+    for entity in entities.values():
+        counts[entity.status] = counts.get(entity.status, 0) + 1
+    return counts
+
+
+def _format(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
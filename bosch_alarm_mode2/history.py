@@ -1,7 +1,11 @@
 import abc
+import bisect
 import logging
-from datetime import datetime
-from typing import NamedTuple
+import struct
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, NamedTuple, overload
 from .history_const import (
     B_G_HISTORY_FORMAT,
     AMAX_HISTORY_FORMAT,
@@ -9,18 +13,12 @@ from .history_const import (
     SOLUTION_USERS,
     EVENT_LOOKBACK_COUNT,
 )
-from .utils import BE_INT, LE_INT
-
-LOG = logging.getLogger(__name__)
+from .codec import be16, be32
 
+if TYPE_CHECKING:
+    from .history_store import HistoryStore
 
-class HistoryEvent(NamedTuple):
-    id: int
-    date: datetime
-    message: str
-
-    def __repr__(self) -> str:
-        return f"[{self.id}] {self.date} | {self.message}"
+LOG = logging.getLogger(__name__)
 
 
 class HistoryEventParams(NamedTuple):
@@ -32,52 +30,141 @@ class HistoryEventParams(NamedTuple):
     param3: int
 
 
+class HistoryEvent:
+    """A history event, whose message is only rendered when it is first read.
+
+    Events still behave as the (id, date, message) named tuples they used to be:
+    they can be unpacked, indexed and compared to tuples.
+    """
+
+    __slots__ = ("id", "date", "params", "_message", "_formatter")
+
+    _fields = ("id", "date", "message")
+
+    def __init__(
+        self,
+        id: int,
+        date: datetime,
+        message: str | None = None,
+        params: HistoryEventParams | None = None,
+        formatter: Callable[[HistoryEventParams], str] | None = None,
+    ) -> None:
+        self.id = id
+        self.date = date
+        # The raw event fields; None for events that failed to parse.
+        self.params = params
+        self._message = message
+        self._formatter = formatter
+
+    @property
+    def message(self) -> str:
+        if self._message is None:
+            try:
+                assert self._formatter and self.params
+                self._message = self._formatter(self.params)
+            except Exception as excp:
+                self._message = f"parse error: {repr(excp)}"
+                LOG.error("History event %d %s", self.id, self._message)
+            self._formatter = None
+        return self._message
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter((self.id, self.date, self.message))
+
+    def __getitem__(self, index: int) -> Any:
+        return (self.id, self.date, self.message)[index]
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+    def _asdict(self) -> dict[str, Any]:
+        return {"id": self.id, "date": self.date, "message": self.message}
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, HistoryEvent):
+            other = tuple(other)
+        if not isinstance(other, tuple):
+            return NotImplemented
+        return tuple(self) == other
+
+    def __hash__(self) -> int:
+        return hash(tuple(self))
+
+    def __repr__(self) -> str:
+        return f"[{self.id}] {self.date} | {self.message}"
+
+
+# Subscription event header: event id, code, area, param1-3 and timestamp.
+SUBSCRIPTION_EVENT = struct.Struct(">IHHHHHI")
+
+
 class HistoryParser:
     __metaclass__ = abc.ABCMeta
 
-    def parse_subscription_event(self, raw_event: bytearray) -> HistoryEvent:
-        event_code = str(BE_INT.int16(raw_event, 4))
-        area = BE_INT.int16(raw_event, 6)
-        param123 = _sequential_params(raw_event[8:])
-        timestamp = BE_INT.int32(raw_event, 14)
+    # Layout of a single polled history event record.
+    RECORD: struct.Struct
+
+    def parse_subscription_event(self, raw_event: memoryview, pos: int = 0) -> HistoryEvent:
+        id, code, area, param1, param2, param3, timestamp = SUBSCRIPTION_EVENT.unpack_from(
+            raw_event, pos
+        )
         date = self._parse_subscription_event_timestamp(timestamp)
-        params = HistoryEventParams._make((date, event_code, area, *param123))
-        return HistoryEvent(BE_INT.int32(raw_event) + 1, *self._parse_event(params))
+        params = HistoryEventParams(date, str(code), area, param1, param2, param3)
+        return self._make_event(id + 1, params)
 
     def parse_polled_event(self, id: int, event_data: bytearray) -> HistoryEvent:
-        return HistoryEvent(id, *self._parse_event(self._parse_event_params(event_data)))
+        return self.parse_polled_record(id, self.RECORD.unpack_from(event_data))
+
+    def parse_polled_record(self, id: int, record: tuple[int, ...]) -> HistoryEvent:
+        return self._make_event(id, self._parse_event_params(record))
+
+    def unpack_polled_records(
+        self, event_data: bytearray, offset: int, count: int
+    ) -> list[tuple[int, ...]]:
+        """Unpack all the records of a polled history response in one pass."""
+        length = (len(event_data) - offset) // count
+        if length < self.RECORD.size:
+            raise struct.error(f"history records of {length} bytes are too short")
+        if length == self.RECORD.size:
+            end = offset + count * length
+            with memoryview(event_data) as view:
+                return list(self.RECORD.iter_unpack(view[offset:end]))
+        # Some panels pad their records beyond the fields we decode.
+        return [self.RECORD.unpack_from(event_data, offset + i * length) for i in range(count)]
+
+    def _make_event(self, id: int, params: HistoryEventParams) -> HistoryEvent:
+        return HistoryEvent(id, params.date, params=params, formatter=self._format_message)
 
     def parse_start_event_id(self, event_data: bytearray) -> int:
-        return BE_INT.int32(event_data, 1)
+        return be32(event_data, 1)
 
     @abc.abstractmethod
     def _parse_subscription_event_timestamp(self, timestamp: int) -> datetime:
         pass
 
     @abc.abstractmethod
-    def _parse_event_params(self, event: bytearray) -> HistoryEventParams:
+    def _parse_event_params(self, record: tuple[int, ...]) -> HistoryEventParams:
         pass
 
     @abc.abstractmethod
-    def _parse_event(self, event: HistoryEventParams) -> tuple[datetime, str]:
+    def _format_message(self, event: HistoryEventParams) -> str:
         pass
 
 
-def _parse_sol_amax_params(event: bytearray) -> HistoryEventParams:
-    timestamp = LE_INT.int16(event)
+# Solution and AMAX records: two packed timestamp words, area, event code and user.
+SOL_AMAX_RECORD = struct.Struct("<HHHBB")
+
+
+def _parse_sol_amax_params(record: tuple[int, ...]) -> HistoryEventParams:
+    timestamp, timestamp2, area, event_code, user = record
     minute = timestamp & 0x3F
     hour = (timestamp >> 6) & 0x1F
     day = (timestamp >> 11) & 0x1F
-    timestamp = LE_INT.int16(event, 2)
-    second = timestamp & 0x3F
-    month = (timestamp >> 6) & 0x0F
-    year = 2000 + (timestamp >> 10)
+    second = timestamp2 & 0x3F
+    month = (timestamp2 >> 6) & 0x0F
+    year = 2000 + (timestamp2 >> 10)
     date = datetime(year, month, day, hour, minute, second)
-
-    event_code = str(event[6])
-    area = LE_INT.int16(event, 4)
-    param123 = (area, event[7], 0)
-    return HistoryEventParams._make((date, event_code, area, *param123))
+    return HistoryEventParams(date, str(event_code), area, area, user, 0)
 
 
 def _parse_sol_amax_timestamp(timestamp: int) -> datetime:
@@ -91,18 +178,17 @@ def _parse_sol_amax_timestamp(timestamp: int) -> datetime:
 
 
 class SolutionHistoryParser(HistoryParser):
-    def _parse_event_params(self, event: bytearray) -> HistoryEventParams:
-        return _parse_sol_amax_params(event)
+    RECORD = SOL_AMAX_RECORD
 
-    def _parse_event(self, event: HistoryEventParams) -> tuple[datetime, str]:
+    def _parse_event_params(self, record: tuple[int, ...]) -> HistoryEventParams:
+        return _parse_sol_amax_params(record)
+
+    def _format_message(self, event: HistoryEventParams) -> str:
         user = SOLUTION_USERS.get(
             event.param2, f"User {event.param2}" if event.param2 <= 32 else ""
         )
-        return (
-            event.date,
-            SOLUTION_HISTORY_FORMAT[event.code].format(
-                user=user, param1=event.param1, param2=event.param2
-            ),
+        return SOLUTION_HISTORY_FORMAT[event.code].format(
+            user=user, param1=event.param1, param2=event.param2
         )
 
     def _parse_subscription_event_timestamp(self, timestamp: int) -> datetime:
@@ -110,8 +196,10 @@ class SolutionHistoryParser(HistoryParser):
 
 
 class AmaxHistoryParser(HistoryParser):
-    def _parse_event_params(self, event: bytearray) -> HistoryEventParams:
-        return _parse_sol_amax_params(event)
+    RECORD = SOL_AMAX_RECORD
+
+    def _parse_event_params(self, record: tuple[int, ...]) -> HistoryEventParams:
+        return _parse_sol_amax_params(record)
 
     def _parse_subscription_event_timestamp(self, timestamp: int) -> datetime:
         return _parse_sol_amax_timestamp(timestamp)
@@ -119,9 +207,9 @@ class AmaxHistoryParser(HistoryParser):
     def parse_start_event_id(self, event_data: bytearray) -> int:
         # AMAX panels use some bytes of the event id as flags
         # Apply a mask to only keep the actual event id
-        return BE_INT.int32(event_data, 1) & 0x001FF
+        return be32(event_data, 1) & 0x001FF
 
-    def _parse_event(self, event: HistoryEventParams) -> tuple[datetime, str]:
+    def _format_message(self, event: HistoryEventParams) -> str:
         # Amax requires different strings depending on param1 sometimes
         key_specs = [
             ("", None),
@@ -136,16 +224,16 @@ class AmaxHistoryParser(HistoryParser):
             if predicate and not predicate(event.param1):
                 continue
             if template := AMAX_HISTORY_FORMAT.get(event.code + suffix):
-                return (
-                    event.date,
-                    template.format(param1=event.param1, param2=event.param2),
-                )
-        return (event.date, f"Unknown event {event}")
+                return template.format(param1=event.param1, param2=event.param2)
+        return f"Unknown event {event}"
 
 
 class BGHistoryParser(HistoryParser):
-    def _parse_event_params(self, event: bytearray) -> HistoryEventParams:
-        timestamp = BE_INT.int32(event, 10)
+    # Event code, area, param1-3 and a packed timestamp.
+    RECORD = struct.Struct(">HHHHHI")
+
+    def _parse_event_params(self, record: tuple[int, ...]) -> HistoryEventParams:
+        event_code, area, param1, param2, param3, timestamp = record
         year = 2010 + (timestamp >> 26)
         month = (timestamp >> 22) & 0x0F
         day = (timestamp >> 17) & 0x1F
@@ -154,10 +242,7 @@ class BGHistoryParser(HistoryParser):
         second = timestamp & 0x3F
 
         date = datetime(year, month, day, hour, minute, second)
-        event_code = str(BE_INT.int16(event))
-        area = BE_INT.int16(event, 2)
-        param123 = _sequential_params(event[4:])
-        return HistoryEventParams._make((date, event_code, area, *param123))
+        return HistoryEventParams(date, str(event_code), area, param1, param2, param3)
 
     def _parse_subscription_event_timestamp(self, timestamp: int) -> datetime:
         minute = timestamp & 0x3F
@@ -168,35 +253,265 @@ class BGHistoryParser(HistoryParser):
         second = timestamp >> 26
         return datetime(year, month, day, hour, minute, second)
 
-    def _parse_event(self, event: HistoryEventParams) -> tuple[datetime, str]:
-        return (
-            event.date,
-            B_G_HISTORY_FORMAT[event.code].format(
-                area=event.area,
-                param1=event.param1,
-                param2=event.param2,
-                param3=event.param3,
-            ),
+    def _format_message(self, event: HistoryEventParams) -> str:
+        return B_G_HISTORY_FORMAT[event.code].format(
+            area=event.area,
+            param1=event.param1,
+            param2=event.param2,
+            param3=event.param3,
         )
 
 
+def _event_date(e: HistoryEvent) -> datetime:
+    return e.date
+
+
+class _HistoryIndex:
+    """Secondary indexes over the retained history events.
+
+    Events are grouped by code, area and param1 in insertion order, and are
+    also kept sorted by date. Events must be removed oldest first.
+    """
+
+    # Removed events are left at the front of the date index until they make up
+    # more than half of it, so that removing the oldest event is O(1).
+    COMPACT_THRESHOLD = 1024
+
+    FIELDS = ("code", "area", "param1")
+
+    def __init__(self) -> None:
+        self._by_field: dict[str, dict[str | int, deque[HistoryEvent]]] = {
+            field: {} for field in self.FIELDS
+        }
+        self._by_date: list[HistoryEvent] = []
+        # Index of the oldest event still in _by_date.
+        self._start = 0
+
+    def add(self, e: HistoryEvent) -> None:
+        if e.params:
+            for field, index in self._by_field.items():
+                index.setdefault(getattr(e.params, field), deque()).append(e)
+        if len(self._by_date) == self._start or self._by_date[-1].date <= e.date:
+            self._by_date.append(e)
+        else:
+            bisect.insort_right(self._by_date, e, lo=self._start, key=_event_date)
+
+    def remove(self, e: HistoryEvent) -> None:
+        if e.params:
+            for field, index in self._by_field.items():
+                key = getattr(e.params, field)
+                events = index[key]
+                if events[0] is e:
+                    events.popleft()
+                else:
+                    # By identity: comparing would render messages, and could
+                    # match another event with the same id, date and message.
+                    i = 0
+                    while events[i] is not e:
+                        i += 1
+                    del events[i]
+                if not events:
+                    del index[key]
+        i = bisect.bisect_left(self._by_date, e.date, lo=self._start, key=_event_date)
+        while self._by_date[i] is not e:
+            i += 1
+        if i != self._start:
+            del self._by_date[i]
+            return
+        self._start += 1
+        if self._start > self.COMPACT_THRESHOLD and self._start * 2 > len(self._by_date):
+            del self._by_date[: self._start]
+            self._start = 0
+
+    def query(
+        self,
+        start: datetime | None,
+        end: datetime | None,
+        **fields: str | int,
+    ) -> list[HistoryEvent]:
+        # Start from the smallest candidate set, and filter on everything else.
+        by_date = self._by_date
+        lo = self._start
+        if start:
+            lo = bisect.bisect_left(by_date, start, lo=lo, key=_event_date)
+        hi = bisect.bisect_left(by_date, end, lo=lo, key=_event_date) if end else len(by_date)
+        candidates: Iterable[HistoryEvent] | None = None
+        count = max(0, hi - lo)
+        for field, value in fields.items():
+            events = self._by_field[field].get(value)
+            if not events:
+                return []
+            if len(events) < count:
+                candidates, count = events, len(events)
+        if candidates is None:
+            candidates = by_date[lo:hi]
+            if not fields:
+                return candidates
+        elif len(fields) == 1 and start is None and end is None:
+            return list(candidates)
+        return [
+            e
+            for e in candidates
+            if e.params
+            and all(getattr(e.params, field) == value for field, value in fields.items())
+            and (start is None or e.date >= start)
+            and (end is None or e.date < end)
+        ]
+
+
+class EventsView(Sequence[HistoryEvent]):
+    """A read-only, live view of the retained history events, oldest first."""
+
+    __slots__ = ("_events",)
+
+    def __init__(self, events: deque[HistoryEvent]) -> None:
+        self._events = events
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    @overload
+    def __getitem__(self, index: int) -> HistoryEvent: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> list[HistoryEvent]: ...
+
+    def __getitem__(self, index: int | slice) -> HistoryEvent | list[HistoryEvent]:
+        if isinstance(index, slice):
+            return [self._events[i] for i in range(*index.indices(len(self._events)))]
+        return self._events[index]
+
+    def __iter__(self) -> Iterator[HistoryEvent]:
+        return iter(self._events)
+
+    def __reversed__(self) -> Iterator[HistoryEvent]:
+        return reversed(self._events)
+
+    def __repr__(self) -> str:
+        return repr(list(self._events))
+
+
 class History:
     def __init__(self) -> None:
-        self._events: list[HistoryEvent] = []
+        self._events: deque[HistoryEvent] = deque()
+        self._events_view = EventsView(self._events)
+        self._index = _HistoryIndex()
         self._parser: HistoryParser | None = None
         self._max_count = 0
+        self._store: "HistoryStore | None" = None
+        self._store_key = ""
+        self._unstored: list[HistoryEvent] = []
+        self._retain_count: int | None = None
+        self._retain_age: timedelta | None = None
+        self._on_evict: Callable[[HistoryEvent], None] | None = None
+        # The most recent event, which is kept even once evicted.
+        self._last: HistoryEvent | None = None
+        self.total_events = 0
         self.has_errored = False
 
+    def __len__(self) -> int:
+        return len(self._events)
+
     @property
-    def events(self) -> list[HistoryEvent]:
-        return self._events
+    def events(self) -> EventsView:
+        """The retained events, oldest first; a live view, so copy it with list()
+        to keep a snapshot."""
+        return self._events_view
+
+    def set_retention(
+        self,
+        max_count: int | None = None,
+        max_age: timedelta | None = None,
+        on_evict: Callable[[HistoryEvent], None] | None = None,
+    ) -> None:
+        """Limit the events kept in memory to the max_count most recent ones, and to
+        those newer than max_age (checked as events are added). Evicted events are
+        passed to on_evict, oldest first."""
+        self._retain_count = max_count
+        self._retain_age = max_age
+        self._on_evict = on_evict
+        self._evict()
+
+    def query(
+        self,
+        code: int | str | None = None,
+        area: int | None = None,
+        param1: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[HistoryEvent]:
+        """Return the retained events matching all the given fields, with dates in
+        [start, end). Events are returned oldest first when filtering on dates only,
+        and in the order they were received otherwise."""
+        fields: dict[str, str | int] = {}
+        if code is not None:
+            fields["code"] = str(code)
+        if area is not None:
+            fields["area"] = area
+        if param1 is not None:
+            fields["param1"] = param1
+        if not fields and start is None and end is None:
+            return list(self._events)
+        return self._index.query(start, end, **fields)
 
     @property
     def last_event_id(self) -> int:
         # Requesting a very large starting event id causes the panel to reply
         # with the event number of the next event to be written to the history,
         # allowing us to discover the max existing event id.
-        return self._events[-1][0] if self._events else 0xFFFFFFFF
+        return self._last.id if self._last else 0xFFFFFFFF
+
+    async def attach_store(self, store: "HistoryStore", key: str) -> None:
+        """Persist events to the given store, resuming from its last event."""
+        if self._store is store and self._store_key == key:
+            return
+        self._store = store
+        self._store_key = key
+        if not self._last:
+            tail = await store.tail(key, EVENT_LOOKBACK_COUNT)
+            for e in tail:
+                if e.params and self._parser:
+                    # Stored events carry their fields, and are rendered as they are read.
+                    e = self._parser._make_event(e.id, e.params)
+                self._add(e)
+            self._evict()
+            if self._last:
+                LOG.debug("Resuming history after event %d", self.last_event_id)
+
+    def _add(self, e: HistoryEvent) -> None:
+        self._events.append(e)
+        self._index.add(e)
+        self._last = e
+
+    def _append(self, events: Iterable[HistoryEvent]) -> None:
+        for e in events:
+            self._add(e)
+            self.total_events += 1
+            if self._store:
+                self._unstored.append(e)
+        self._evict()
+
+    def _evict(self) -> None:
+        if self._retain_count is not None:
+            while len(self._events) > self._retain_count:
+                self._evicted(self._events.popleft())
+        if self._retain_age is not None:
+            cutoff = datetime.now() - self._retain_age
+            while self._events and self._events[0].date < cutoff:
+                self._evicted(self._events.popleft())
+
+    def _evicted(self, e: HistoryEvent) -> None:
+        self._index.remove(e)
+        if self._on_evict:
+            try:
+                self._on_evict(e)
+            except Exception:
+                LOG.exception("History eviction callback failed")
+
+    def _write_to_store(self) -> None:
+        if self._store and self._unstored:
+            self._store.append(self._store_key, self._unstored)
+            self._unstored = []
 
     def init_for_panel(self, panel_type: int) -> None:
         if panel_type <= 0x21 or panel_type == 0x28:
@@ -209,53 +524,56 @@ class History:
     def _append_error(self, id: int, excp: Exception) -> None:
         error_str = f"parse error: {repr(excp)}"
         LOG.error("History event " + error_str)
-        self._events.append(HistoryEvent(id, datetime.now(), error_str))
+        self._append([HistoryEvent(id, datetime.now(), error_str)])
 
     def parse_polled_events(self, event_data: bytearray | None) -> int | None:
         if not event_data or not self._parser:
             return None
         count = event_data[0]
         start = self._parser.parse_start_event_id(event_data) + 1
-        event_data = event_data[5:]
         # Panels can have large numbers of history events, which take a very
         # long time load. Limit to EVENT_LOOKBACK_COUNT most recent events.
         if count == 0:
-            return max(0, start - EVENT_LOOKBACK_COUNT - 1) if len(self._events) == 0 else None
+            return max(0, start - EVENT_LOOKBACK_COUNT - 1) if self._last is None else None
 
-        event_length = len(event_data) // count
-        for i in range(start, start + count):
-            try:
-                e = self._parser.parse_polled_event(i, event_data)
-                if self._events and e.date < self._events[-1].date:
-                    return None
-                LOG.debug(e)
-                self._events.append(e)
-                event_data = event_data[event_length:]
-            except Exception as excp:
-                self._append_error(i, excp)
+        try:
+            records = self._parser.unpack_polled_records(event_data, 5, count)
+        except struct.error as excp:
+            self._append_error(start, excp)
+            return None
+        try:
+            for i, record in enumerate(records, start):
+                try:
+                    e = self._parser.parse_polled_record(i, record)
+                    if self._last and e.date < self._last.date:
+                        return None
+                    LOG.debug(e)
+                    self._append([e])
+                except Exception as excp:
+                    self._append_error(i, excp)
+        finally:
+            self._write_to_store()
 
         if count > self._max_count:
             self._max_count = count
         # A truncated batch indicates the end of events.
         return self.last_event_id if count == self._max_count else None
 
-    def parse_subscription_event(self, raw_event: bytearray) -> int:
+    def parse_subscription_event(self, raw_event: memoryview, pos: int = 0) -> int:
         if not self._parser:
             return 0
         event_id = None
         try:
-            text_len = BE_INT.int16(raw_event, 23)
-            event_id = BE_INT.int32(raw_event)
+            text_len = be16(raw_event, pos + 23)
+            event_id = be32(raw_event, pos)
             total_len = 25 + text_len
-            e = self._parser.parse_subscription_event(raw_event)
+            e = self._parser.parse_subscription_event(raw_event, pos)
             LOG.debug(e)
-            self._events.append(e)
+            self._append([e])
             return total_len
         except Exception as excp:
             if event_id:
                 self._append_error(event_id + 1, excp)
-            return len(raw_event)
-
-
-def _sequential_params(data: bytearray) -> tuple[int, int, int]:
-    return (BE_INT.int16(data, 0), BE_INT.int16(data, 2), BE_INT.int16(data, 4))
+            return len(raw_event) - pos
+        finally:
+            self._write_to_store()
@@ -0,0 +1,111 @@
+import abc
+import asyncio
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Any
+
+from .history import HistoryEvent, HistoryEventParams
+
+LOG = logging.getLogger(__name__)
+
+
+class HistoryStore(abc.ABC):
+    """Append-only persistent storage for history events.
+
+    A single store can be shared by several panels; events are kept apart
+    by the panel key passed to each call. append() is called as events are
+    received, so it must not block the event loop.
+    """
+
+    @abc.abstractmethod
+    def append(self, panel: str, events: list[HistoryEvent]) -> None:
+        pass
+
+    @abc.abstractmethod
+    async def tail(self, panel: str, count: int) -> list[HistoryEvent]:
+        """Return the last count events written for the panel, oldest first.
+
+        Events that were parsed come back with their params but no message.
+        """
+
+    def close(self) -> None:
+        pass
+
+
+class SQLiteHistoryStore(HistoryStore):
+    """Stores history events in an SQLite database.
+
+    Database access runs on a single worker thread, in the order of the
+    calls, so appends never wait for the disk.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history-store")
+        self._db = self._executor.submit(self._open, path).result()
+
+    @staticmethod
+    def _open(path: str) -> sqlite3.Connection:
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        # Rows are keyed by insertion order: AMAX panels wrap their event ids
+        # every 512 events, and other panels may reuse them too.
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS history_events ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "panel TEXT NOT NULL, id INTEGER NOT NULL, date TEXT NOT NULL, message TEXT, "
+            "code TEXT, area INTEGER, param1 INTEGER, param2 INTEGER, param3 INTEGER)"
+        )
+        db.execute("CREATE INDEX IF NOT EXISTS history_events_panel ON history_events (panel, seq)")
+        db.commit()
+        return db
+
+    def append(self, panel: str, events: list[HistoryEvent]) -> None:
+        # Messages are rendered from the stored fields when the events are read
+        # back; only events that failed to parse store theirs.
+        rows = [(panel, e.id, e.date.isoformat(), _message(e), *_fields(e)) for e in events]
+        self._executor.submit(self._insert, rows)
+
+    def _insert(self, rows: list[tuple[str | int | None, ...]]) -> None:
+        try:
+            with self._db:
+                self._db.executemany(
+                    "INSERT INTO history_events (panel, id, date, message, code, area, "
+                    "param1, param2, param3) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+        except sqlite3.Error as excp:
+            LOG.warning("Failed to store %d history events: %s", len(rows), excp)
+
+    async def tail(self, panel: str, count: int) -> list[HistoryEvent]:
+        loop = asyncio.get_running_loop()
+        rows = await loop.run_in_executor(self._executor, self._select_tail, panel, count)
+        events = []
+        for id, date, message, code, *fields in rows[::-1]:
+            date = datetime.fromisoformat(date)
+            params = HistoryEventParams(date, code, *fields) if code is not None else None
+            events.append(HistoryEvent(id, date, message, params))
+        return events
+
+    def _select_tail(self, panel: str, count: int) -> list[Any]:
+        return self._db.execute(
+            "SELECT id, date, message, code, area, param1, param2, param3 FROM history_events "
+            "WHERE panel = ? ORDER BY seq DESC LIMIT ?",
+            (panel, count),
+        ).fetchall()
+
+    def close(self) -> None:
+        """Wait for pending appends to be written, and close the database."""
+        self._executor.submit(self._db.close)
+        self._executor.shutdown()
+
+
+def _message(event: HistoryEvent) -> str | None:
+    return None if event.params else event.message
+
+
+def _fields(event: HistoryEvent) -> tuple[str | int | None, ...]:
+    # Everything but the date, which is stored for all events.
+    return tuple(event.params[1:]) if event.params else (None,) * 5
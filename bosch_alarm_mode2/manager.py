@@ -0,0 +1,156 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Callable
+from datetime import datetime, timedelta
+from typing import Any, NamedTuple
+
+from .changes import OVERFLOW, ChangeStream, EntityChange
+from .history import HistoryEvent
+from .panel import Panel
+from .scheduler import ReconnectScheduler
+from .utils import Observable
+
+LOG = logging.getLogger(__name__)
+
+
+class PanelChange(NamedTuple):
+    """An EntityChange on one of the panels of a PanelManager."""
+
+    panel: str
+    entity_type: str
+    entity_id: int
+    attribute: str
+    old: Any
+    new: Any
+    time: datetime
+
+
+class PanelManager:
+    """Runs many panels in one event loop.
+
+    All panels share a ReconnectScheduler, so connecting them, and
+    reconnecting them after an outage, is spread out in time and bounded in
+    concurrency. Status, changes and history are aggregated over the panels,
+    which are identified by the name they were added with.
+    """
+
+    def __init__(self, max_concurrent_connects: int = 8, reconnect_jitter: float = 10.0) -> None:
+        self.scheduler = ReconnectScheduler(max_concurrent_connects, reconnect_jitter)
+        self.panels: dict[str, Panel] = {}
+        # Notified when any panel connects or disconnects.
+        self.connection_status_observer = Observable()
+        # Notified when any panel receives history events.
+        self.history_observer = Observable()
+        self._change_listeners: list[Callable[[list[PanelChange]], None]] = []
+        self._detach: dict[str, Callable[[], None]] = {}
+
+    def add(
+        self,
+        name: str,
+        host: str,
+        port: int,
+        automation_code: str | None,
+        installer_or_user_code: str | None,
+        **kwargs: Any,
+    ) -> Panel:
+        """Add a panel; any further arguments are passed on to Panel."""
+        if name in self.panels:
+            raise ValueError(f"panel {name} already exists")
+        panel = Panel(
+            host,
+            port,
+            automation_code,
+            installer_or_user_code,
+            scheduler=self.scheduler,
+            **kwargs,
+        )
+
+        def on_changes(changes: list[EntityChange]) -> None:
+            panel_changes = [PanelChange(name, *change) for change in changes]
+            for listener in self._change_listeners:
+                listener(panel_changes)
+
+        connection_status_notify = self.connection_status_observer._notify
+        history_notify = self.history_observer._notify
+        panel.connection_status_observer.attach(connection_status_notify)
+        panel.history_observer.attach(history_notify)
+        panel.change_observer.attach(on_changes)
+
+        def detach() -> None:
+            panel.connection_status_observer.detach(connection_status_notify)
+            panel.history_observer.detach(history_notify)
+            panel.change_observer.detach(on_changes)
+
+        self.panels[name] = panel
+        self._detach[name] = detach
+        return panel
+
+    async def remove(self, name: str) -> None:
+        panel = self.panels.pop(name)
+        self._detach.pop(name)()
+        await panel.disconnect()
+
+    async def connect(self, load_selector: int = Panel.LOAD_ALL) -> None:
+        """Connect all panels, at most max_concurrent_connects at a time.
+
+        Panels that fail to connect are logged, and retried in the background.
+        """
+
+        async def connect(name: str, panel: Panel) -> None:
+            try:
+                await panel.connect(load_selector)
+            except asyncio.CancelledError:
+                raise
+            except Exception as excp:
+                LOG.warning("Failed to connect to %s, will retry: %s", name, excp)
+
+        await asyncio.gather(*(connect(name, panel) for name, panel in self.panels.items()))
+
+    async def disconnect(self) -> None:
+        await asyncio.gather(*(panel.disconnect() for panel in self.panels.values()))
+
+    def connection_status(self) -> dict[str, bool]:
+        return {name: panel.connection_status() for name, panel in self.panels.items()}
+
+    @property
+    def connected(self) -> int:
+        return sum(panel.connection_status() for panel in self.panels.values())
+
+    def attach_change_listener(self, listener: Callable[[list[PanelChange]], None]) -> None:
+        """Receive the change sets of all panels, tagged with the panel name."""
+        self._change_listeners.append(listener)
+
+    def detach_change_listener(self, listener: Callable[[list[PanelChange]], None]) -> None:
+        self._change_listeners.remove(listener)
+
+    async def changes(
+        self, maxsize: int = 10000, overflow: str = OVERFLOW.DROP_OLDEST
+    ) -> AsyncIterator[PanelChange]:
+        """Iterate over the entity changes of all panels, as Panel.changes()."""
+        stream: ChangeStream[PanelChange] = ChangeStream(maxsize, overflow)
+        self.attach_change_listener(stream.put)
+        try:
+            async for change in stream:
+                yield change
+        finally:
+            self.detach_change_listener(stream.put)
+
+    def query_events(
+        self,
+        code: int | str | None = None,
+        area: int | None = None,
+        param1: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[tuple[str, HistoryEvent]]:
+        """Find history events on all panels, as Panel.query_events(), ordered by date."""
+        events = [
+            (name, event)
+            for name, panel in self.panels.items()
+            for event in panel.query_events(code, area, param1, start, end)
+        ]
+        events.sort(key=lambda item: item[1].date)
+        return events
+
+    def recent_events(self, max_age: timedelta) -> list[tuple[str, HistoryEvent]]:
+        return self.query_events(start=datetime.now() - max_age)
@@ -0,0 +1,96 @@
+import bisect
+from typing import Any
+
+# Upper bounds of the latency histogram buckets, in seconds.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    """A histogram of durations over fixed buckets; cheap enough to always keep."""
+
+    __slots__ = ("counts", "count", "sum", "max")
+
+    def __init__(self) -> None:
+        # One count per bucket, and one for anything larger.
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q quantile, as the upper bound of the bucket it falls in."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "buckets": dict(zip(LATENCY_BUCKETS + (float("inf"),), self.counts)),
+        }
+
+
+class ConnectionMetrics:
+    """Counters for the traffic to and from one panel, kept across reconnects.
+
+    latency is the round-trip time of each command by command code, and
+    semaphore_wait the time commands queued before they could be sent.
+    handshake is the time to establish the connection, TLS included, and
+    reconnect the time from losing the connection to being loaded again.
+    """
+
+    def __init__(self) -> None:
+        self.latency: dict[int, Histogram] = {}
+        self.semaphore_wait = Histogram()
+        self.handshake = Histogram()
+        self.reconnect = Histogram()
+        self.pending = 0
+        self.max_pending = 0
+        self.commands = 0
+        self.timeouts = 0
+        self.resyncs = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.responses = 0
+        self.status_frames = 0
+        self.connects = 0
+        self.tls_resumptions = 0
+
+    def command_latency(self, code: int) -> Histogram:
+        if (histogram := self.latency.get(code)) is None:
+            histogram = self.latency[code] = Histogram()
+        return histogram
+
+    def snapshot(self) -> dict[str, Any]:
+        return {
+            "latency": {code: h.snapshot() for code, h in self.latency.items()},
+            "semaphore_wait": self.semaphore_wait.snapshot(),
+            "handshake": self.handshake.snapshot(),
+            "reconnect": self.reconnect.snapshot(),
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "commands": self.commands,
+            "timeouts": self.timeouts,
+            "resyncs": self.resyncs,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "responses": self.responses,
+            "status_frames": self.status_frames,
+            "connects": self.connects,
+            "tls_resumptions": self.tls_resumptions,
+        }
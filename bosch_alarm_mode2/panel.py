@@ -1,10 +1,10 @@
 import asyncio
-from collections.abc import Callable
+from collections.abc import AsyncIterator, Callable, Coroutine
 import logging
 import ssl
 import time
 from datetime import datetime, timedelta
-from typing import Any, Generator
+from typing import Any, Generator, TypeVar
 
 from .const import (
     ALARM_MEMORY_PRIORITIES,
@@ -13,6 +13,7 @@ from .const import (
     AREA_READY_STATUS,
     AREA_STATUS,
     CMD,
+    CMD_IDEMPOTENT,
     CMD_REQUEST_MAX,
     DOOR_ACTION,
     DOOR_STATUS,
@@ -23,16 +24,43 @@ from .const import (
     POINT_STATUS,
     USER_TYPE,
 )
+from .cache import EntityCache
+from .capture import DIRECTION, CaptureWriter, ReplayTransport
+from .changes import OVERFLOW, ChangeBatcher, ChangeStream, EntityChange
+from .codec import (
+    be16,
+    encode_alarm_detail_request,
+    encode_area_arm,
+    encode_history_request,
+    encode_ids,
+    encode_state_request,
+    encode_subscription,
+    encode_text_request,
+)
 from .connection import Connection
-from .history import History, HistoryEvent
-from .utils import BE_INT, Observable
+from .history import EventsView, History, HistoryEvent
+from .history_store import HistoryStore
+from .metrics import ConnectionMetrics
+from .polling import DEFAULT_POLL_INTERVALS, PollInterval, PollScheduler
+from .scheduler import ReconnectBackoff, ReconnectScheduler
+from .tls import ResumingSSLContext, client_ssl_context
+from .utils import Observable
 
 LOG = logging.getLogger(__name__)
 
-ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-ssl_context.check_hostname = False
-ssl_context.verify_mode = ssl.CERT_NONE
-ssl_context.set_ciphers("DEFAULT")
+# The TLS settings of panels created without an ssl_context.
+ssl_context = client_ssl_context()
+
+T = TypeVar("T")
+E = TypeVar("E", bound="PanelEntity")
+
+# Seconds between checks of the connection for liveness and command skew.
+MONITOR_INTERVAL = 30.0
+# Panels that send heartbeats are considered dead once this many are missed,
+# and silent for at least MONITOR_INTERVAL; other panels once they have been
+# silent for DEFAULT_LIVENESS_TIMEOUT.
+MISSED_HEARTBEATS = 3
+DEFAULT_LIVENESS_TIMEOUT = 180.0
 
 
 def _supported_format(value: int, masks: list[tuple[int, int]]) -> int:
@@ -43,10 +71,24 @@ def _supported_format(value: int, masks: list[tuple[int, int]]) -> int:
 
 
 class PanelEntity:
+    # Large panels have hundreds of entities, so they are slotted, and their
+    # observers are only created once something attaches to them.
+    __slots__ = ("name", "_status", "_status_observer", "_id", "_changes")
+    _entity_type = ""
+
     def __init__(self, name: str | None, status: int) -> None:
         self.name = str(name)
-        self.status_observer = Observable()
-        self.status = status
+        self._status = status
+        self._status_observer: Observable | None = None
+        # Set by the panel that owns the entity.
+        self._id = 0
+        self._changes: ChangeBatcher | None = None
+
+    @property
+    def status_observer(self) -> Observable:
+        if self._status_observer is None:
+            self._status_observer = Observable()
+        return self._status_observer
 
     @property
     def status(self) -> int:
@@ -54,18 +96,48 @@ class PanelEntity:
 
     @status.setter
     def status(self, value: int) -> None:
-        self._status = value
-        self.status_observer._notify()
+        if value == self._status:
+            return
+        old, self._status = self._status, value
+        self._record_change("status", old, value)
+        if self._status_observer:
+            self._status_observer._notify()
+
+    def _observed(self) -> bool:
+        return self._changes is not None and self._changes.has_listeners
+
+    def _record_change(self, attribute: str, old: Any, new: Any) -> None:
+        # Building the change is skipped altogether while nobody listens.
+        if self._changes is not None and self._changes.has_listeners:
+            self._changes.record(
+                EntityChange(self._entity_type, self._id, attribute, old, new, datetime.now())
+            )
 
 
 class Area(PanelEntity):
+    __slots__ = ("_ready_observer", "_alarm_observer", "_ready", "_faults", "_alarms")
+    _entity_type = "area"
+
     def __init__(self, name: str | None = None, status: int = AREA_STATUS.UNKNOWN) -> None:
         PanelEntity.__init__(self, name, status)
-        self.ready_observer = Observable()
-        self.alarm_observer = Observable()
-        self._set_ready(AREA_READY_STATUS.NOT, 0)
+        self._ready_observer: Observable | None = None
+        self._alarm_observer: Observable | None = None
+        self._ready = AREA_READY_STATUS.NOT
+        self._faults = 0
         self._alarms: set[int] = set()
 
+    @property
+    def ready_observer(self) -> Observable:
+        if self._ready_observer is None:
+            self._ready_observer = Observable()
+        return self._ready_observer
+
+    @property
+    def alarm_observer(self) -> Observable:
+        if self._alarm_observer is None:
+            self._alarm_observer = Observable()
+        return self._alarm_observer
+
     @property
     def all_ready(self) -> bool:
         return self._ready == AREA_READY_STATUS.ALL
@@ -87,16 +159,28 @@ class Area(PanelEntity):
         return list(self._alarms)
 
     def _set_ready(self, ready: int, faults: int) -> None:
+        if ready == self._ready and faults == self._faults:
+            return
+        old = (self._ready, self._faults)
         self._ready = ready
         self._faults = faults
-        self.ready_observer._notify()
+        self._record_change("ready", old, (ready, faults))
+        if self._ready_observer:
+            self._ready_observer._notify()
 
     def _set_alarm(self, priority: int, state: bool) -> None:
+        if state == (priority in self._alarms):
+            return
+        observed = self._observed()
+        old = tuple(sorted(self._alarms)) if observed else ()
         if state:
             self._alarms.add(priority)
         else:
             self._alarms.discard(priority)
-        self.alarm_observer._notify()
+        if observed:
+            self._record_change("alarms", old, tuple(sorted(self._alarms)))
+        if self._alarm_observer:
+            self._alarm_observer._notify()
 
     def is_disarmed(self) -> bool:
         return self.status == AREA_STATUS.DISARMED
@@ -130,7 +214,8 @@ class Area(PanelEntity):
     def reset(self) -> None:
         self.status = AREA_STATUS.UNKNOWN
         self._set_ready(AREA_READY_STATUS.NOT, 0)
-        self._alarms = set()
+        for priority in list(self._alarms):
+            self._set_alarm(priority, False)
 
     def __repr__(self) -> str:
         return "%s: %s [%s] (%d)" % (
@@ -142,6 +227,9 @@ class Area(PanelEntity):
 
 
 class Point(PanelEntity):
+    __slots__ = ()
+    _entity_type = "point"
+
     def __init__(self, name: str | None = None, status: int = POINT_STATUS.UNKNOWN):
         PanelEntity.__init__(self, name, status)
 
@@ -159,6 +247,9 @@ class Point(PanelEntity):
 
 
 class Door(PanelEntity):
+    __slots__ = ()
+    _entity_type = "door"
+
     def __init__(self, name: str | None = None, status: int = DOOR_STATUS.UNKNOWN):
         PanelEntity.__init__(self, name, status)
 
@@ -182,6 +273,9 @@ class Door(PanelEntity):
 
 
 class Output(PanelEntity):
+    __slots__ = ()
+    _entity_type = "output"
+
     def __init__(self, name: str | None = None, status: int = OUTPUT_STATUS.UNKNOWN):
         PanelEntity.__init__(self, name, status)
 
@@ -195,25 +289,90 @@ class Output(PanelEntity):
         return f"{self.name}: {OUTPUT_STATUS.TEXT[self.status]}"
 
 
+class _Flight:
+    __slots__ = ("task", "sent")
+
+    def __init__(self, coro: Coroutine[Any, Any, bytearray]) -> None:
+        self.sent = False
+        self.task = asyncio.ensure_future(coro)
+        # All callers may have gone by the time it fails.
+        self.task.add_done_callback(lambda task: task.cancelled() or task.exception())
+
+    def mark_sent(self) -> None:
+        self.sent = True
+
+
 class Panel:
     """Connection to a Bosch Alarm Panel using the "Mode 2" API."""
 
     def __init__(
-        self, host: str, port: int, automation_code: str | None, installer_or_user_code: str | None
+        self,
+        host: str,
+        port: int,
+        automation_code: str | None,
+        installer_or_user_code: str | None,
+        cache_path: str | None = None,
+        history_store: HistoryStore | None = None,
+        scheduler: ReconnectScheduler | None = None,
+        poll_intervals: dict[str, PollInterval] | None = None,
+        fast_resume: bool = False,
+        reconnect_backoff: ReconnectBackoff | None = None,
+        ssl_context: ssl.SSLContext | None = None,
     ) -> None:
+        """Create a panel connection; call connect() to establish it.
+
+        If cache_path is set, entity names are cached there across restarts.
+        If history_store is set, history events are persisted to it, and
+        loading resumes after the last stored event.
+        If scheduler is set, connection attempts are throttled by it.
+        poll_intervals overrides DEFAULT_POLL_INTERVALS for panels that don't
+        support subscriptions.
+        If fast_resume is set, entity status is kept, rather than reset, while
+        disconnected, and reconnecting to the same panel only refreshes status.
+        A lost connection is reconnected straight away, and failed attempts
+        are retried after the delays given by reconnect_backoff.
+        ssl_context overrides the TLS settings of the module-level ssl_context; a
+        ResumingSSLContext, as used by default, resumes the TLS session when
+        reconnecting.
+        """
         LOG.debug("Panel created")
         self._host = host
         self._port = port
         self._installer_or_user_code = installer_or_user_code
         self._automation_code = automation_code
+        self._cache = EntityCache(cache_path) if cache_path else None
+        self._history_store = history_store
+        self._scheduler = scheduler
+        self._fast_resume = fast_resume
+        self._reconnect_backoff = reconnect_backoff or ReconnectBackoff()
+        self._ssl_context = ssl_context
 
         self.connection_status_observer = Observable()
         self.history_observer = Observable()
         self.faults_observer = Observable()
+        # Receives one list of entity changes per status frame or status response.
+        self.change_observer = ChangeBatcher()
+        # See attach_status_frame_listener.
+        self._status_frame_listeners: list[Callable[[memoryview], None]] = []
+        # In flight idempotent reads, keyed by command code and request data.
+        self._flights: dict[bytes, _Flight] = {}
+        self._command_timeouts: dict[int, float] = {}
+        self._metrics = ConnectionMetrics()
+        self._capture: CaptureWriter | None = None
+        self._default_command_timeout: float | None = None
         self._connection: Connection | None = None
         self._monitor_connection_task: asyncio.Task[Any] | None = None
         self._last_msg: datetime | None = None
+        self._disconnected_t: float | None = None
+        # Wakes up the connection monitor when the connection is lost, or the
+        # liveness timeout is learned.
+        self._monitor_wakeup = asyncio.Event()
+        # The longest time seen between heartbeats this session, which sets the
+        # liveness timeout.
+        self._heartbeat_interval: float | None = None
+        self._last_heartbeat: float | None = None
         self._poll_task: asyncio.Task[None] | None = None
+        self._poll_scheduler = PollScheduler(DEFAULT_POLL_INTERVALS | (poll_intervals or {}))
 
         # Model is always set by basicinfo
         self.model: PanelModel = None # type: ignore[assignment]
@@ -221,6 +380,9 @@ class Panel:
         self.firmware_version: str | None = None
         self.serial_number: int | None = None
         self._faults_bitmap = 0
+        # The WHAT_ARE_YOU response, which identifies the model, firmware and
+        # capabilities of the panel.
+        self._identity: bytes | None = None
         self._history = History()
         self._history_cmd: int = CMD.REQUEST_RAW_HISTORY_EVENTS
         self.areas: dict[int, Area] = {}
@@ -232,6 +394,7 @@ class Panel:
         self._all_arming_id = (AREA_ARMING_STATUS.MASTER_DELAY, AREA_ARMING_STATUS.MASTER_INSTANT)
         self._supports_serial = False
         self._supports_door = False
+        self._supports_pipelining = False
         self._set_subscription_supported_format = 0
         self._area_text_supported_format = 0
         self._output_text_supported_format = 0
@@ -239,25 +402,53 @@ class Panel:
         self._door_text_supported_format = 0
         self._alarm_summary_supported_format = 0
 
+        # Status update consumers, keyed by update type. Each consumer decodes one
+        # update at the given offset, and returns its length. The second callback
+        # is invoked after all updates of that type in a frame are consumed.
+        self._status_consumers: dict[
+            int, tuple[Callable[[memoryview, int], int], Callable[[], None] | None]
+        ] = {
+            0x00: (lambda data, pos: 0, self._heartbeat_finalizer),
+            0x01: (self._event_summary_consumer, None),
+            0x02: (self._event_history_consumer, self._event_history_finalizer),
+            0x04: (self._area_on_off_consumer, self._area_on_off_finalizer),
+            0x05: (self._area_ready_consumer, None),
+            0x06: (self._output_status_consumer, self._output_status_finalizer),
+            0x07: (self._point_status_consumer, None),
+            0x08: (self._door_status_consumer, None),
+            0x0A: (self._panel_status_consumer, None),
+        }
+
     LOAD_EXTENDED_INFO = 1 << 0
     LOAD_ENTITIES = 1 << 1
     LOAD_STATUS = 1 << 2
     LOAD_ALL = LOAD_EXTENDED_INFO | LOAD_ENTITIES | LOAD_STATUS
 
     async def connect(self, load_selector: int = LOAD_ALL) -> None:
-        loop = asyncio.get_running_loop()
-        self._monitor_connection_task = loop.create_task(self._monitor_connection())
-        await self._connect(load_selector)
+        try:
+            await self._scheduled_connect(load_selector, reconnect=False)
+        finally:
+            # If this attempt failed, the monitor keeps retrying.
+            loop = asyncio.get_running_loop()
+            self._monitor_connection_task = loop.create_task(self._monitor_connection())
 
     async def load(self, load_selector: int) -> None:
         if load_selector & self.LOAD_EXTENDED_INFO:
             await self._extended_info()
         if load_selector & self.LOAD_ENTITIES:
-            await self._load_areas()
-            await self._load_points()
-            await self._load_outputs()
-            await self._load_doors()
+            if self._cache:
+                await self._cache.load(self._panel_key())
+            await self._gather(
+                self._load_areas(),
+                self._load_points(),
+                self._load_outputs(),
+                self._load_doors(),
+            )
+            if self._cache:
+                await self._cache.save()
         if load_selector & self.LOAD_STATUS:
+            if self._history_store:
+                await self._history.attach_store(self._history_store, self._history_key())
             await self._load_status()
             if self._set_subscription_supported_format:
                 await self._subscribe()
@@ -267,9 +458,132 @@ class Panel:
                 LOG.info("Panel does not support subscriptions, falling back to polling")
 
     @property
-    def events(self) -> list[HistoryEvent]:
+    def events(self) -> EventsView:
         return self._history.events
 
+    def query_events(
+        self,
+        code: int | str | None = None,
+        area: int | None = None,
+        param1: int | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+    ) -> list[HistoryEvent]:
+        """Find history events by code, area, param1 (usually the point or user)
+        and date range, using indexes rather than scanning all events."""
+        return self._history.query(code, area, param1, start, end)
+
+    def set_history_retention(
+        self,
+        max_count: int | None = None,
+        max_age: timedelta | None = None,
+        on_evict: Callable[[HistoryEvent], None] | None = None,
+    ) -> None:
+        """Bound the history kept in memory; by default it is kept indefinitely."""
+        self._history.set_retention(max_count, max_age, on_evict)
+
+    async def changes(
+        self, maxsize: int = 1000, overflow: str = OVERFLOW.DROP_OLDEST
+    ) -> AsyncIterator[EntityChange]:
+        """Iterate over entity changes as they happen, with async for.
+
+        Each iteration has its own queue of up to maxsize changes; see OVERFLOW
+        for what happens when the consumer falls behind.
+        """
+        stream: ChangeStream[EntityChange] = ChangeStream(maxsize, overflow)
+        self.change_observer.attach(stream.put)
+        try:
+            async for change in stream:
+                yield change
+        finally:
+            self.change_observer.detach(stream.put)
+
+    def attach_status_frame_listener(self, listener: Callable[[memoryview], None]) -> None:
+        """Call listener with each raw status frame from the panel, e.g. to relay
+        it. The frame is only valid for the duration of the call."""
+        self._status_frame_listeners.append(listener)
+
+    def detach_status_frame_listener(self, listener: Callable[[memoryview], None]) -> None:
+        self._status_frame_listeners.remove(listener)
+
+    async def send_command(self, code: int, data: bytes = b"") -> bytearray:
+        """Send a raw Mode 2 command over the session, and return its response data.
+
+        Raises NackError if the panel rejects the command. Identical reads that
+        are in flight at the same time are only sent once.
+        """
+        return await self._send_command(code, data)
+
+    @property
+    def automation_code(self) -> str | None:
+        return self._automation_code
+
+    @property
+    def installer_or_user_code(self) -> str | None:
+        return self._installer_or_user_code
+
+    @property
+    def metrics(self) -> ConnectionMetrics:
+        """Traffic counters and command latencies for this panel, across reconnects.
+
+        Use metrics.snapshot() for a plain dict of the current values.
+        """
+        return self._metrics
+
+    def start_capture(self, path: str) -> None:
+        """Record all traffic with the panel to path, across reconnects, until
+        stop_capture. The capture can be played back with replay."""
+        self.stop_capture()
+        self._capture = CaptureWriter(path)
+        if self._connection:
+            self._connection.capture = self._capture
+            self._capture.record(DIRECTION.CONNECTED)
+
+    def stop_capture(self) -> None:
+        if self._capture:
+            self._capture.close()
+            self._capture = None
+            if self._connection:
+                self._connection.capture = None
+
+    async def replay(
+        self, path: str, speed: float | None = None, load_selector: int = LOAD_ALL, session: int = 0
+    ) -> None:
+        """Connect to a captured session instead of a panel, and play it back.
+
+        The panel is driven by the recorded responses and status updates, at the
+        recorded pace scaled by speed, or as fast as possible if speed is None.
+        Once played back, the session stays open until disconnect is called.
+        """
+        connection = self._new_connection()
+        transport = ReplayTransport(path, connection, speed, session)
+        playback = asyncio.ensure_future(transport.play())
+        try:
+            await self._start_session(connection, load_selector)
+            await playback
+        finally:
+            playback.cancel()
+        if transport.mismatched_writes:
+            LOG.warning(
+                "Replay diverged: %d commands differ from the capture", transport.mismatched_writes
+            )
+
+    def set_command_timeouts(
+        self, timeouts: dict[int, float] | None = None, default: float | None = None
+    ) -> None:
+        """Override how long to wait for responses, by command code (see
+        connection.COMMAND_TIMEOUTS), and for all other commands."""
+        self._command_timeouts.update(timeouts or {})
+        if default is not None:
+            self._default_command_timeout = default
+        if self._connection:
+            self._apply_command_timeouts(self._connection)
+
+    def _apply_command_timeouts(self, connection: Connection) -> None:
+        connection.command_timeouts.update(self._command_timeouts)
+        if self._default_command_timeout is not None:
+            connection.default_command_timeout = self._default_command_timeout
+
     async def disconnect(self) -> None:
         if self._monitor_connection_task:
             self._monitor_connection_task.cancel()
@@ -346,76 +660,169 @@ class Panel:
             print("Events:")
             print(*self.events, sep="\n")
 
+    def _new_connection(self) -> Connection:
+        return Connection(self._on_status_update, self._on_disconnect, self._metrics, self._capture)
+
     async def _connect(self, load_selector: int) -> None:
         LOG.debug("Connecting to %s:%d...", self._host, self._port)
-
-        def connection_factory() -> Connection:
-            return Connection(
-                self._on_status_update,
-                self._on_disconnect,
-            )
-
-        _, connection = await asyncio.wait_for(
+        start_t = time.perf_counter()
+        context = self._ssl_context or ssl_context
+        transport, connection = await asyncio.wait_for(
             asyncio.get_running_loop().create_connection(
-                connection_factory, host=self._host, port=self._port, ssl=ssl_context
+                self._new_connection, host=self._host, port=self._port, ssl=context
             ),
             timeout=30,
         )
+        self._metrics.handshake.observe(time.perf_counter() - start_t)
+        ssl_object = transport.get_extra_info("ssl_object")
+        if ssl_object and ssl_object.session_reused:
+            self._metrics.tls_resumptions += 1
+        await self._start_session(connection, load_selector)
+        if ssl_object and isinstance(context, ResumingSSLContext):
+            context.remember(ssl_object)
+
+    async def _start_session(self, connection: Connection, load_selector: int) -> None:
         self._last_msg = datetime.now()
         self._connection = connection
-        await self._basicinfo()
+        self._apply_command_timeouts(connection)
+        same_panel = await self._basicinfo()
         if load_selector:
             await self._authenticate()
             LOG.debug("Authentication success!")
+            if self._fast_resume and load_selector == self.LOAD_STATUS:
+                if same_panel and await self._same_serial_number():
+                    LOG.debug("Resuming session with the same panel")
+                else:
+                    LOG.info("Panel changed since it was last connected, reloading")
+                    load_selector = self.LOAD_ALL
             await self.load(load_selector)
+        if self._disconnected_t is not None:
+            self._metrics.reconnect.observe(time.perf_counter() - self._disconnected_t)
+            self._disconnected_t = None
         self.connection_status_observer._notify()
 
+    async def _scheduled_connect(self, load_selector: int, reconnect: bool = True) -> None:
+        if not self._scheduler:
+            await self._connect(load_selector)
+            return
+        async with self._scheduler.slot(reconnect):
+            # Another attempt may have connected while this one was waiting.
+            if not self._connection:
+                await self._connect(load_selector)
+
     async def _send_command(self, code: int, data: bytes = bytearray()) -> bytearray:
         if not self._connection:
             raise asyncio.InvalidStateError("Not connected")
-        return await self._connection.send_command(code, data)
+        if code not in CMD_IDEMPOTENT:
+            return await self._connection.send_command(code, data)
+        # Identical reads share a request while it waits to be sent. Once it has
+        # been sent, later callers need a fresh response, and share a follow-up
+        # that is sent after it completes.
+        key = bytes((code,)) + data
+        flight = self._flights.get(key)
+        if flight is None or flight.sent:
+            flight = _Flight(self._fly(key, code, data, flight))
+            self._flights[key] = flight
+        # The response is shared, but callers are free to modify what they get.
+        return bytearray(await asyncio.shield(flight.task))
+
+    async def _fly(
+        self, key: bytes, code: int, data: bytes, previous: "_Flight | None"
+    ) -> bytearray:
+        flight = self._flights[key]
+        try:
+            if previous:
+                await asyncio.wait([previous.task])
+            if not self._connection:
+                raise asyncio.InvalidStateError("Not connected")
+            return await self._connection.send_command(code, data, flight.mark_sent)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _history_key(self) -> str:
+        # Panels that don't report a serial number are identified by address.
+        identity = self.serial_number or f"{self._host}:{self._port}"
+        return f"{self.model.name}/{identity}"
+
+    def _panel_key(self) -> str:
+        # Names may change with the firmware, but history carries over.
+        return f"{self._history_key()}/{self.firmware_version}"
+
+    async def _gather(self, *coros: Coroutine[Any, Any, T]) -> list[T]:
+        """Run independent requests concurrently if the panel accepts pipelined commands."""
+        if not self._supports_pipelining:
+            try:
+                return [await coro for coro in coros]
+            finally:
+                # Don't leave the remaining requests unawaited if one of them failed.
+                for coro in coros:
+                    coro.close()
+        tasks = [asyncio.ensure_future(coro) for coro in coros]
+        try:
+            return await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    def _bind(self, entities: dict[int, E]) -> dict[int, E]:
+        for id, entity in entities.items():
+            entity._id = id
+            entity._changes = self.change_observer
+        return entities
 
     def _on_disconnect(self) -> None:
         self._connection = None
+        self._flights.clear()
         self._last_msg = None
-        for a in self.areas.values():
-            a.reset()
-        for p in self.points.values():
-            p.reset()
+        # The heartbeat interval is the panel's, so it is kept for the next session.
+        self._last_heartbeat = None
+        self._disconnected_t = time.perf_counter()
+        self._monitor_wakeup.set()
+        if not self._fast_resume:
+            with self.change_observer.batch():
+                for a in self.areas.values():
+                    a.reset()
+                for p in self.points.values():
+                    p.reset()
         self.connection_status_observer._notify()
         if self._poll_task:
             self._poll_task.cancel()
             self._poll_task = None
 
     async def _load_status(self) -> None:
-        await self._load_entity_status(CMD.AREA_STATUS, self.areas)
-        await self._load_entity_status(CMD.POINT_STATUS, self.points)
-        await self._load_output_status()
-        await self._load_alarm_status()
+        await self._gather(
+            self._load_entity_status(CMD.AREA_STATUS, self.areas),
+            self._load_entity_status(CMD.POINT_STATUS, self.points),
+            self._load_output_status(),
+            self._load_alarm_status(),
+        )
+        # History can only be loaded once the area status is known.
         await self._load_history()
-        await self._load_faults()
-        if self._supports_door:
-            await self._load_entity_status(CMD.DOOR_STATUS, self.doors, 1)
+        await self._gather(
+            self._load_faults(),
+            self._load_entity_status(CMD.DOOR_STATUS, self.doors, 1),
+        )
 
     async def _load_history(self) -> None:
         # Don't retrieve history when in any state that isn't disarmed, as panels do not support this.
         if not all(area.is_disarmed() for area in self.areas.values()):
             return
         try:
-            start_size = len(self.events)
+            start_size = self._history.total_events
             start_t = time.perf_counter()
             event_id: int | None = self._history.last_event_id
             while event_id is not None:
-                request = bytearray(b"\xff")
-                request.extend(event_id.to_bytes(4, "big"))
+                request = encode_history_request(event_id)
                 data = await self._send_command(self._history_cmd, request)
                 self._last_msg = datetime.now()
                 if event_id := self._history.parse_polled_events(data):
                     self.history_observer._notify()
-            if len(self.events) != start_size:
+            if self._history.total_events != start_size:
                 LOG.debug(
                     "Loaded %d history events in %.2fs"
-                    % (len(self.events) - start_size, time.perf_counter() - start_t)
+                    % (self._history.total_events - start_size, time.perf_counter() - start_t)
                 )
         except Exception:
             if not self._history.has_errored:
@@ -425,40 +832,98 @@ class Panel:
                 self._history.has_errored = True
 
     async def _monitor_connection(self) -> None:
+        failures = 0 if self._connection else 1
         while True:
             try:
-                await asyncio.sleep(30)
+                if self._connection:
+                    failures = 0
+                    await self._wait_for_disconnect()
+                    if not self._connection:
+                        continue
+                else:
+                    await asyncio.sleep(self._reconnect_backoff.delay(failures))
+                    failures += 1
                 await self._monitor_connection_once()
             except asyncio.exceptions.CancelledError:
                 raise
+            except OSError as excp:
+                LOG.warning("Failed to reconnect: %s", excp)
             except:
                 logging.exception("Connection monitor exception")
 
+    async def _wait_for_disconnect(self) -> None:
+        # Wait until the connection is lost, or is next due to be checked: in
+        # time to notice it has outlived the liveness timeout.
+        idle_time = (datetime.now() - (self._last_msg or datetime.now())).total_seconds()
+        timeout = min(MONITOR_INTERVAL, max(self._liveness_timeout() - idle_time, 0))
+        self._monitor_wakeup.clear()
+        try:
+            await asyncio.wait_for(self._monitor_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+
+    def _liveness_timeout(self) -> float:
+        if self._heartbeat_interval is None:
+            return DEFAULT_LIVENESS_TIMEOUT
+        # A burst of heartbeats can't make a slow link look dead.
+        return max(self._heartbeat_interval * MISSED_HEARTBEATS, MONITOR_INTERVAL)
+
     async def _poll(self) -> None:
-        while True:
-            try:
-                await asyncio.sleep(1)
-                await self._load_status()
-                self._last_msg = datetime.now()
-            except asyncio.exceptions.CancelledError:
-                raise
-            except:
-                logging.exception("Polling exception")
+        loaders: dict[str, Callable[[], Coroutine[Any, Any, None]]] = {
+            "areas": lambda: self._load_entity_status(CMD.AREA_STATUS, self.areas),
+            "points": lambda: self._load_entity_status(CMD.POINT_STATUS, self.points),
+            "alarms": self._load_alarm_status,
+            "outputs": self._load_output_status,
+            "doors": lambda: self._load_entity_status(CMD.DOOR_STATUS, self.doors, 1),
+            "faults": self._load_faults,
+        }
+        changed = False
+
+        def on_changes(changes: list[EntityChange]) -> None:
+            nonlocal changed
+            changed = True
+
+        self.change_observer.attach(on_changes)
+        try:
+            while True:
+                names = await self._poll_scheduler.wait()
+                changed = False
+                history_size = self._history.total_events
+                faults = self._faults_bitmap
+                try:
+                    await self._gather(*(loaders[name]() for name in names if name in loaders))
+                    # History can only be loaded once the area status is known.
+                    if "history" in names:
+                        await self._load_history()
+                    self._last_msg = datetime.now()
+                except asyncio.exceptions.CancelledError:
+                    raise
+                except:
+                    logging.exception("Polling exception")
+                active = (
+                    changed
+                    or history_size != self._history.total_events
+                    or faults != self._faults_bitmap
+                )
+                self._poll_scheduler.polled(names, active)
+        finally:
+            self.change_observer.detach(on_changes)
 
     async def _monitor_connection_once(self) -> None:
         if not self._connection:
             loaded = self.areas and self.points
             load_selector = self.LOAD_STATUS if loaded else self.LOAD_ALL
             try:
-                await self._connect(load_selector)
+                await self._scheduled_connect(load_selector)
             except asyncio.exceptions.TimeoutError:
                 LOG.debug("Connection timed out...")
             return
 
         idle_time = datetime.now() - (self._last_msg or datetime.fromtimestamp(0))
-        if idle_time > timedelta(minutes=3):
+        if idle_time >= timedelta(seconds=self._liveness_timeout()):
             LOG.warning("Heartbeat expired (%s): resetting connection.", idle_time)
             self._connection.close()
+            return
         # Buggy panels sometimes drop responses. This results in requests being
         # matched to the wrong responses, and getting stuck in the queue.
         # Detect if this has occurred by checking the response of a known command.
@@ -525,7 +990,8 @@ class Panel:
         if self._installer_or_user_code:
             await self._authenticate_remote_user()
 
-    async def _basicinfo(self) -> None:
+    async def _basicinfo(self) -> bool:
+        """Identify the panel; returns whether it is the panel identified last time."""
         try:
             data = await self._send_command(CMD.WHAT_ARE_YOU, bytearray([3]))
         except Exception:
@@ -534,10 +1000,16 @@ class Panel:
         self.model = PANEL_MODELS[data[0]]
         self.protocol_version = "v%d.%d" % (data[5], data[6])
         # B and G series panels support multiple commands in flight, AMAX and Solution panels do not.
-        if data[0] >= 0xA0 and self._connection:
+        self._supports_pipelining = data[0] >= 0xA0
+        if self._supports_pipelining and self._connection:
             self._connection.set_max_commands_in_flight(100)
         if data[13]:
             LOG.warning("busy flag: %d", data[13])
+        # Everything but the busy flag stays the same until the panel is replaced or updated.
+        identity = bytes(data[:13] + data[14:])
+        if identity == self._identity:
+            return True
+        self._identity = identity
 
         # Solution and AMAX panels use different arming types from B/G series panels.
         if data[0] <= 0x28:
@@ -572,6 +1044,14 @@ class Panel:
             if bitmask[16] & 0x02
             else CMD.REQUEST_RAW_HISTORY_EVENTS
         )
+        return False
+
+    async def _same_serial_number(self) -> bool:
+        # WHAT_ARE_YOU doesn't identify panels of the same model apart.
+        if not self._supports_serial or self.serial_number is None:
+            return True
+        data = await self._send_command(CMD.PRODUCT_SERIAL, b"\x00\x00")
+        return int.from_bytes(data[0:6], "big") == self.serial_number
 
     async def set_panel_date(self, date: datetime) -> None:
         year = date.year
@@ -598,6 +1078,8 @@ class Panel:
             self.firmware_version = "v%d.%d" % (version, revision)
 
     def _set_panel_faults(self, faults: int) -> None:
+        if faults == self._faults_bitmap:
+            return
         self._faults_bitmap = faults
         self.faults_observer._notify()
 
@@ -612,7 +1094,7 @@ class Panel:
     async def _load_faults(self) -> None:
         if self._supports_status:
             data = await self._send_command(CMD.REQUEST_PANEL_SYSTEM_STATUS)
-            self._set_panel_faults(BE_INT.int16(data, 5))
+            self._set_panel_faults(be16(data, 5))
 
     async def _load_outputs(self) -> None:
         names = await self._load_names(
@@ -622,7 +1104,7 @@ class Panel:
             "OUTPUT",
             1,
         )
-        self.outputs = {id: Output(name) for id, name in names.items()}
+        self.outputs = self._bind({id: Output(name) for id, name in names.items()})
 
     async def _load_areas(self) -> None:
         names = await self._load_names(
@@ -631,7 +1113,7 @@ class Panel:
             self._area_text_supported_format,
             "AREA",
         )
-        self.areas = {id: Area(name) for id, name in names.items()}
+        self.areas = self._bind({id: Area(name) for id, name in names.items()})
 
     async def _load_points(self) -> None:
         names = await self._load_names(
@@ -640,7 +1122,7 @@ class Panel:
             self._point_text_supported_format,
             "POINT",
         )
-        self.points = {id: Point(name) for id, name in names.items()}
+        self.points = self._bind({id: Point(name) for id, name in names.items()})
 
     async def _load_doors(self) -> None:
         if not self._supports_door:
@@ -652,36 +1134,36 @@ class Panel:
             "DOOR",
             1,
         )
-        self.doors = {id: Door(name) for id, name in names.items()}
+        self.doors = self._bind({id: Door(name) for id, name in names.items()})
 
     async def _load_names_cf03(self, name_cmd: int, enabled_ids: list[int]) -> dict[int, str]:
         id = 0
         names = {}
         while True:
-            request = bytearray(id.to_bytes(2, "big"))
-            request.append(0x00)  # primary language
-            request.append(0x01)  # return many
+            request = encode_text_request(id, many=True)
             data = await self._send_command(name_cmd, request)
             if not data:
                 break
-            while data:
-                id = BE_INT.int16(data)
-                name, data = data[2:].split(b"\x00", 1)
+            pos = 0
+            while pos < len(data):
+                id = be16(data, pos)
+                end = data.index(0, pos + 2)
                 if id in enabled_ids:
-                    names[id] = name.decode("utf8")
+                    names[id] = data[pos + 2 : end].decode("utf8")
+                pos = end + 1
         return names
 
     async def _load_names_cf01(
         self, name_cmd: int, enabled_ids: list[int], id_size: int = 2
     ) -> dict[int, str]:
-        names: dict[int, str] = {}
-        for id in enabled_ids:
-            request = bytearray(id.to_bytes(id_size, "big"))
-            request.append(0x00)  # primary language
+        async def load_name(id: int) -> str:
+            request = encode_text_request(id, id_size)
             data = await self._send_command(name_cmd, request)
             name = data.split(b"\x00", 1)[0]
-            names[id] = name.decode("utf8")
-        return names
+            return name.decode("utf8")
+
+        names = await self._gather(*(load_name(id) for id in enabled_ids))
+        return dict(zip(enabled_ids, names))
 
     async def _load_entity_set(self, cmd: int) -> list[int]:
         data = await self._send_command(cmd)
@@ -702,11 +1184,16 @@ class Panel:
     ) -> dict[int, str]:
         enabled_ids = await self._load_entity_set(config_cmd)
 
-        if supported_format == 3:
-            return await self._load_names_cf03(name_cmd, enabled_ids)
-
-        if supported_format == 1:
-            return await self._load_names_cf01(name_cmd, enabled_ids, id_size)
+        if supported_format in (1, 3):
+            if self._cache and (names := self._cache.names(type, enabled_ids)) is not None:
+                return names
+            if supported_format == 3:
+                names = await self._load_names_cf03(name_cmd, enabled_ids)
+            else:
+                names = await self._load_names_cf01(name_cmd, enabled_ids, id_size)
+            if self._cache:
+                self._cache.set_names(type, enabled_ids, names)
+            return names
 
         # And then if CF01 isn't available, we can just generate a list of names and return that
         return {id: f"{type}{id}" for id in enabled_ids}
@@ -714,28 +1201,28 @@ class Panel:
     async def _get_alarms_for_priority(
         self, priority: int, last_area: int | None = None, last_point: int | None = None
     ) -> None:
-        request = bytearray([priority])
-        if last_area and last_point:
-            request.extend(last_area.to_bytes(2, "big"))
-            request.extend(last_point.to_bytes(2, "big"))
+        request = encode_alarm_detail_request(priority, last_area, last_point)
         response_detail = await self._send_command(CMD.ALARM_MEMORY_DETAIL, request)
-        while response_detail:
-            area = BE_INT.int16(response_detail)
-            point = BE_INT.int16(response_detail, 3)
-            if point == 0xFFFF:
-                # # 0xFFFF is sentinel that indicates that more points are available.
-                # Issues a follow-up starting at the last valid point. 
-                await self._get_alarms_for_priority(priority, last_area, last_point)
-                return
-            last_area = area
-            last_point = point
-            if area in self.areas:
-                self.areas[area]._set_alarm(priority, True)
-            else:
-                LOG.warning(
-                    f"Found unknown area {area}, supported areas: [{list(self.areas.keys())}]"
-                )
-            response_detail = response_detail[5:]
+        more = False
+        with self.change_observer.batch():
+            for pos in range(0, len(response_detail) - 4, 5):
+                area = be16(response_detail, pos)
+                point = be16(response_detail, pos + 3)
+                if point == 0xFFFF:
+                    # # 0xFFFF is sentinel that indicates that more points are available.
+                    more = True
+                    break
+                last_area = area
+                last_point = point
+                if area in self.areas:
+                    self.areas[area]._set_alarm(priority, True)
+                else:
+                    LOG.warning(
+                        f"Found unknown area {area}, supported areas: [{list(self.areas.keys())}]"
+                    )
+        if more:
+            # Issues a follow-up starting at the last valid point.
+            await self._get_alarms_for_priority(priority, last_area, last_point)
 
     async def _load_alarm_status(self) -> None:
         if not self._alarm_summary_supported_format:
@@ -743,15 +1230,19 @@ class Panel:
 
         format = bytearray([0x02] if self._alarm_summary_supported_format == 2 else [])
         data = await self._send_command(CMD.ALARM_MEMORY_SUMMARY, format)
-        for priority in ALARM_MEMORY_PRIORITIES.TEXT.keys():
-            i = (priority - 1) * 2
-            count = BE_INT.int16(data, i)
-            if count:
-                await self._get_alarms_for_priority(priority)
-            else:
-                # Nothing triggered, clear alarms
-                for area in self.areas.values():
-                    area._set_alarm(priority, False)
+        triggered = []
+        with self.change_observer.batch():
+            for priority in ALARM_MEMORY_PRIORITIES.TEXT.keys():
+                i = (priority - 1) * 2
+                count = be16(data, i)
+                if count:
+                    triggered.append(priority)
+                else:
+                    # Nothing triggered, clear alarms
+                    for area in self.areas.values():
+                        area._set_alarm(priority, False)
+        for priority in triggered:
+            await self._get_alarms_for_priority(priority)
 
     async def _load_entity_status(
         self, status_cmd: int, entities: dict[int, Any], id_size: int = 2
@@ -764,63 +1255,62 @@ class Panel:
             for i in range(0, len(keys), size):
                 yield keys[i : i + size]
 
-        for id_chunk in chunk(entities, CMD_REQUEST_MAX[status_cmd]):
-            request = bytearray()
-            for id in id_chunk:
-                request.extend(id.to_bytes(id_size, "big"))
-            response = await self._send_command(status_cmd, request)
-            while response:
-                if id_size == 2:
-                    entities[BE_INT.int16(response)].status = response[2]
-                else:
-                    entities[response[0]].status = response[1]
-                response = response[id_size + 1 :]
+        async def load_chunk(id_chunk: list[int]) -> None:
+            response = await self._send_command(status_cmd, encode_ids(id_chunk, id_size))
+            with self.change_observer.batch():
+                for pos in range(0, len(response) - id_size, id_size + 1):
+                    id = be16(response, pos) if id_size == 2 else response[pos]
+                    entities[id].status = response[pos + id_size]
+
+        await self._gather(
+            *(load_chunk(id_chunk) for id_chunk in chunk(entities, CMD_REQUEST_MAX[status_cmd]))
+        )
 
     async def _load_output_status(self) -> None:
         if not self.outputs:
             return
         enabled = await self._load_entity_set(CMD.OUTPUT_STATUS)
-        for id, output in self.outputs.items():
-            output.status = OUTPUT_STATUS.ACTIVE if id in enabled else OUTPUT_STATUS.INACTIVE
+        with self.change_observer.batch():
+            for id, output in self.outputs.items():
+                output.status = OUTPUT_STATUS.ACTIVE if id in enabled else OUTPUT_STATUS.INACTIVE
 
     async def _set_output_state(self, output_id: int, state: int) -> None:
-        request = bytearray([output_id, state])
-        await self._send_command(CMD.SET_OUTPUT_STATE, request)
+        await self._send_command(CMD.SET_OUTPUT_STATE, encode_state_request(output_id, state))
+        self._poll_scheduler.activity()
 
     async def _door_set_state(self, door_id: int, state: int) -> None:
-        request = bytearray([door_id, state])
-        await self._send_command(CMD.SET_DOOR_STATE, request)
+        await self._send_command(CMD.SET_DOOR_STATE, encode_state_request(door_id, state))
+        self._poll_scheduler.activity()
 
     async def _area_arm(self, area_id: int, arm_type: int) -> None:
-        request = bytearray([arm_type])
-        # bitmask with only i-th bit from the left being 1 (section 3.1.4)
-        request.extend(bytearray((area_id - 1) // 8))  # leading 0 bytes
-        request.append(1 << (7 - ((area_id - 1) % 8)))  # i%8-th bit from the left (top) set
-        await self._send_command(CMD.AREA_ARM, request)
+        await self._send_command(CMD.AREA_ARM, encode_area_arm(area_id, arm_type))
+        self._poll_scheduler.activity()
 
     async def _subscribe(self) -> None:
-        IGNORE = b"\x00"
-        SUBSCRIBE = b"\x01"
-        data = bytearray([self._set_subscription_supported_format])  # format
-        data += SUBSCRIBE  # confidence / heartbeat
-        data += SUBSCRIBE  # event mem
-        data += SUBSCRIBE  # event log
-        data += IGNORE  # config change
-        data += SUBSCRIBE  # area on/off
-        data += SUBSCRIBE  # area ready
-        data += SUBSCRIBE  # output status
-        data += SUBSCRIBE  # point status
-        data += SUBSCRIBE  # door status
-        data += IGNORE  # walk test state (unused)
+        IGNORE = False
+        SUBSCRIBE = True
+        subscriptions = [
+            SUBSCRIBE,  # confidence / heartbeat
+            SUBSCRIBE,  # event mem
+            SUBSCRIBE,  # event log
+            IGNORE,  # config change
+            SUBSCRIBE,  # area on/off
+            SUBSCRIBE,  # area ready
+            SUBSCRIBE,  # output status
+            SUBSCRIBE,  # point status
+            SUBSCRIBE,  # door status
+            IGNORE,  # walk test state (unused)
+        ]
         if self._set_subscription_supported_format == 2:
-            data += SUBSCRIBE  # panel system status
-            data += IGNORE  # wireless learn mode state (unused)
+            subscriptions.append(SUBSCRIBE)  # panel system status
+            subscriptions.append(IGNORE)  # wireless learn mode state (unused)
+        data = encode_subscription(self._set_subscription_supported_format, subscriptions)
         await self._send_command(CMD.SET_SUBSCRIPTION, data)
 
-    def _area_on_off_consumer(self, data: bytearray) -> int:
-        area_id = BE_INT.int16(data)
-        area_status = self.areas[area_id].status = data[2]
-        LOG.debug("Area %d: %s" % (area_id, AREA_STATUS.TEXT[area_status]))
+    def _area_on_off_consumer(self, data: memoryview, pos: int) -> int:
+        area_id = be16(data, pos)
+        area_status = self.areas[area_id].status = data[pos + 2]
+        LOG.debug("Area %d: %s", area_id, AREA_STATUS.TEXT[area_status])
         return 3
 
     async def _delayed_load_history(self) -> None:
@@ -831,49 +1321,49 @@ class Panel:
     def _area_on_off_finalizer(self) -> None:
         # If the panel was armed, it is possible that the history was not loaded
         # during startup
-        if len(self.events) == 0:
+        if len(self._history) == 0:
             asyncio.create_task(self._delayed_load_history())
 
-    def _area_ready_consumer(self, data: bytearray) -> int:
-        area_id = BE_INT.int16(data)
+    def _area_ready_consumer(self, data: memoryview, pos: int) -> int:
+        area_id = be16(data, pos)
         # Skip message if it is for an unconfigured area
         if area_id in self.areas:
-            ready_status = data[2]
-            faults = BE_INT.int16(data, 3)
+            ready_status = data[pos + 2]
+            faults = be16(data, pos + 3)
             self.areas[area_id]._set_ready(ready_status, faults)
             LOG.debug(
-                "Area %d: %s (%d faults)" % (area_id, AREA_READY_STATUS.TEXT[ready_status], faults)
+                "Area %d: %s (%d faults)", area_id, AREA_READY_STATUS.TEXT[ready_status], faults
             )
         return 5
 
     # Solution panels send events with output ids that don't match those
     # used by the rest of the commands. This means we can't actually rely
     # on the data from the subscription event and instead need to poll for output status
-    def _output_status_consumer(self, data: bytearray) -> int:
+    def _output_status_consumer(self, data: memoryview, pos: int) -> int:
         return 3
 
     def _output_status_finalizer(self) -> None:
         asyncio.create_task(self._load_output_status())
 
-    def _point_status_consumer(self, data: bytearray) -> int:
-        point_id = BE_INT.int16(data)
+    def _point_status_consumer(self, data: memoryview, pos: int) -> int:
+        point_id = be16(data, pos)
         # Skip message if it is for an unconfigured point
         if point_id in self.points:
-            self.points[point_id].status = data[2]
+            self.points[point_id].status = data[pos + 2]
             LOG.debug("Point updated: %s", self.points[point_id])
         return 3
 
-    def _door_status_consumer(self, data: bytearray) -> int:
-        door_id = BE_INT.int16(data)
+    def _door_status_consumer(self, data: memoryview, pos: int) -> int:
+        door_id = be16(data, pos)
         # Skip message if it is for an unconfigured door
         if door_id in self.doors:
-            self.doors[door_id].status = data[2]
+            self.doors[door_id].status = data[pos + 2]
             LOG.debug("Door updated: %s", self.doors[door_id])
         return 3
 
-    def _event_summary_consumer(self, data: bytearray) -> int:
-        priority = data[0]
-        count = BE_INT.int16(data, 1)
+    def _event_summary_consumer(self, data: memoryview, pos: int) -> int:
+        priority = data[pos]
+        count = be16(data, pos + 1)
         if count:
             asyncio.create_task(self._get_alarms_for_priority(priority))
         else:
@@ -882,8 +1372,8 @@ class Panel:
                 area._set_alarm(priority, False)
         return 3
 
-    def _event_history_consumer(self, data: bytearray) -> int:
-        r = self._history.parse_subscription_event(data)
+    def _event_history_consumer(self, data: memoryview, pos: int) -> int:
+        r = self._history.parse_subscription_event(data, pos)
         self.history_observer._notify()
         return r
 
@@ -893,33 +1383,38 @@ class Panel:
         # we can just update faults when we get a history event.
         asyncio.create_task(self._load_faults())
 
-    def _panel_status_consumer(self, data: bytearray) -> int:
-        self._set_panel_faults(BE_INT.int16(data, 1))
+    def _heartbeat_finalizer(self) -> None:
+        # Heartbeats carry no records, so they are timed here.
+        now = time.monotonic()
+        if self._last_heartbeat is not None:
+            interval = now - self._last_heartbeat
+            if self._heartbeat_interval is None:
+                self._heartbeat_interval = interval
+                self._monitor_wakeup.set()
+            elif interval > self._heartbeat_interval:
+                self._heartbeat_interval = interval
+        self._last_heartbeat = now
+
+    def _panel_status_consumer(self, data: memoryview, pos: int) -> int:
+        self._set_panel_faults(be16(data, pos + 1))
         return 6
 
-    def _on_status_update(self, data: bytearray) -> None:
-        # The second callback is invoked after all updates are consumed.
-        CONSUMERS: dict[int, tuple[Callable[[bytearray], int], Callable[[], None] | None]] = {
-            0x00: (lambda data: 0, None),  # heartbeat
-            0x01: (self._event_summary_consumer, None),
-            0x02: (self._event_history_consumer, self._event_history_finalizer),
-            0x04: (self._area_on_off_consumer, self._area_on_off_finalizer),
-            0x05: (self._area_ready_consumer, None),
-            0x06: (self._output_status_consumer, self._output_status_finalizer),
-            0x07: (self._point_status_consumer, None),
-            0x08: (self._door_status_consumer, None),
-            0x0A: (self._panel_status_consumer, None),
-        }
+    def _on_status_update(self, data: memoryview) -> None:
         pos = 0
-        while pos < len(data):
-            (update_type, n_updates) = data[pos : pos + 2]
-            pos += 2
-            self._last_msg = datetime.now()
-            consumer, finalizer = CONSUMERS[update_type]
-            for _ in range(0, n_updates):
-                pos += consumer(data[pos:])
-            if finalizer:
-                finalizer()
+        end = len(data)
+        with self.change_observer.batch():
+            while pos < end:
+                update_type = data[pos]
+                n_updates = data[pos + 1]
+                pos += 2
+                self._last_msg = datetime.now()
+                consumer, finalizer = self._status_consumers[update_type]
+                for _ in range(n_updates):
+                    pos += consumer(data, pos)
+                if finalizer:
+                    finalizer()
+        for listener in self._status_frame_listeners:
+            listener(data)
 
     @staticmethod
     def _get_arming_id(delay: bool, delay_id: int, instant_id: int | None) -> int:        
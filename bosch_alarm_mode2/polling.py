@@ -0,0 +1,75 @@
+import asyncio
+from typing import NamedTuple
+
+
+class PollInterval(NamedTuple):
+    """Polling interval bounds for one class of panel data, in seconds.
+
+    A class is polled every min seconds while the panel is active, and the
+    interval grows towards max while nothing changes.
+    """
+
+    min: float
+    max: float
+
+
+DEFAULT_POLL_INTERVALS = {
+    "areas": PollInterval(1, 5),
+    "points": PollInterval(1, 5),
+    "alarms": PollInterval(1, 10),
+    "outputs": PollInterval(2, 15),
+    "doors": PollInterval(2, 15),
+    "faults": PollInterval(10, 60),
+    "history": PollInterval(10, 60),
+}
+
+
+class PollScheduler:
+    """Decides which classes of data are due to be polled.
+
+    Any change seen by a poll, or a command sent by the user, marks the panel
+    as active: every class drops back to its minimum interval. Each poll that
+    sees no change multiplies the intervals of the polled classes by backoff.
+    """
+
+    def __init__(self, intervals: dict[str, PollInterval], backoff: float = 1.5) -> None:
+        self._intervals = intervals
+        self._backoff = backoff
+        self._current = {name: interval.min for name, interval in intervals.items()}
+        self._due = dict.fromkeys(intervals, 0.0)
+        self._wakeup = asyncio.Event()
+
+    def interval(self, name: str) -> float:
+        return self._current[name]
+
+    async def wait(self) -> list[str]:
+        """Wait until at least one class is due, and return the due classes."""
+        loop = asyncio.get_running_loop()
+        while True:
+            now = loop.time()
+            due = [name for name, due_at in self._due.items() if due_at <= now]
+            if due:
+                return due
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), min(self._due.values()) - now)
+            except asyncio.TimeoutError:
+                pass
+
+    def polled(self, names: list[str], active: bool) -> None:
+        now = asyncio.get_running_loop().time()
+        if active:
+            self.activity()
+        for name in names:
+            if not active:
+                self._current[name] = min(
+                    self._current[name] * self._backoff, self._intervals[name].max
+                )
+            self._due[name] = now + self._current[name]
+
+    def activity(self) -> None:
+        now = asyncio.get_running_loop().time()
+        for name, interval in self._intervals.items():
+            self._current[name] = interval.min
+            self._due[name] = min(self._due[name], now + interval.min)
+        self._wakeup.set()
@@ -0,0 +1,298 @@
+import asyncio
+import hmac
+import logging
+import ssl
+from collections import deque
+from typing import Any
+
+from .codec import BE16, be16
+from .connection import NackError
+from .const import CMD, PROTOCOL
+from .panel import Panel
+
+LOG = logging.getLogger(__name__)
+
+# Responses to these never change during a session.
+STATIC_COMMANDS = frozenset(
+    {
+        CMD.WHAT_ARE_YOU,
+        CMD.PRODUCT_SERIAL,
+        CMD.REQUEST_CONFIGURED_AREAS,
+        CMD.REQUEST_CONFIGURED_DOORS,
+        CMD.REQUEST_CONFIGURED_OUTPUTS,
+        CMD.REQUEST_CONFIGURED_POINTS,
+        CMD.AREA_TEXT,
+        CMD.DOOR_TEXT,
+        CMD.OUTPUT_TEXT,
+        CMD.POINT_TEXT,
+    }
+)
+# Responses to these are reused until the panel reports a change, a command
+# that may change state is sent, or they are older than the cache ttl.
+STATUS_COMMANDS = frozenset(
+    {
+        CMD.REQUEST_PANEL_SYSTEM_STATUS,
+        CMD.ALARM_MEMORY_SUMMARY,
+        CMD.ALARM_MEMORY_DETAIL,
+        CMD.REQUEST_RAW_HISTORY_EVENTS,
+        CMD.REQUEST_RAW_HISTORY_EVENTS_EXT,
+        CMD.AREA_STATUS,
+        CMD.DOOR_STATUS,
+        CMD.OUTPUT_STATUS,
+        CMD.POINT_STATUS,
+        CMD.REQUEST_DATE_TIME,
+    }
+)
+# Commands that may be sent before authenticating.
+UNAUTHENTICATED_COMMANDS = frozenset(
+    {CMD.WHAT_ARE_YOU, CMD.AUTHENTICATE, CMD.LOGIN_REMOTE_USER, CMD.REQUEST_PANEL_SYSTEM_STATUS}
+)
+
+ACK = b"\xfc"
+NACK = 0xFD
+DATA = 0xFE
+NO_AUTHORITY = 0x06
+INVALID_INTERFACE_STATE = 0x04
+
+
+class PanelProxy:
+    """Serves many Mode 2 clients over one authenticated panel session.
+
+    Clients connect to the proxy as if it were the panel. Reads are answered
+    from a response cache, and identical reads in flight are only sent to the
+    panel once. Status pushes from the panel are fanned out to every client
+    that subscribed. All other commands are forwarded, and their responses
+    returned to the client that sent them, in order.
+
+    Clients authenticate against the proxy rather than the panel: with the
+    automation_code for AUTHENTICATE, and the user_code for LOGIN_REMOTE_USER.
+    Both default to the codes the panel itself is connected with.
+    """
+
+    def __init__(
+        self,
+        panel: Panel,
+        automation_code: str | None = None,
+        user_code: str | None = None,
+        max_clients: int = 0,
+        cache_ttl: float = 1.0,
+    ) -> None:
+        self.panel = panel
+        if automation_code is None and user_code is None:
+            automation_code = panel.automation_code
+            user_code = panel.installer_or_user_code
+            if automation_code is None and user_code is None:
+                raise ValueError("An automation code or user code is required for clients")
+        self._automation_code = automation_code
+        self._user_code = user_code
+        self._max_clients = max_clients
+        self._cache_ttl = cache_ttl
+        self._server: asyncio.Server | None = None
+        self._sessions: set[_ClientSession] = set()
+        # Keyed by command code and request data.
+        self._static: dict[bytes, asyncio.Future[bytearray]] = {}
+        self._status: dict[bytes, tuple[float, asyncio.Future[bytearray]]] = {}
+        self.upstream_requests = 0
+        self.cached_responses = 0
+
+    @property
+    def clients(self) -> int:
+        return len(self._sessions)
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, ssl_context: ssl.SSLContext | None = None
+    ) -> int:
+        """Start accepting clients, and return the port that is listened on."""
+        loop = asyncio.get_running_loop()
+        self._server = await loop.create_server(
+            lambda: _ClientSession(self), host, port, ssl=ssl_context
+        )
+        self.panel.attach_status_frame_listener(self._on_status_frame)
+        self.panel.connection_status_observer.attach(self._on_connection_status)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def close(self) -> None:
+        if self._server:
+            self.panel.detach_status_frame_listener(self._on_status_frame)
+            self.panel.connection_status_observer.detach(self._on_connection_status)
+            self._server.close()
+            for session in list(self._sessions):
+                session.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def _on_status_frame(self, frame: memoryview) -> None:
+        self._status.clear()
+        if not self._sessions:
+            return
+        message = b"\x02" + BE16.pack(len(frame)) + frame
+        for session in self._sessions:
+            if session.subscribed:
+                session.write(message)
+
+    def _on_connection_status(self) -> None:
+        # The panel may have been reconfigured while the session was down.
+        self._static.clear()
+        self._status.clear()
+
+    async def _handle(self, session: "_ClientSession", code: int, data: bytes) -> bytes:
+        if code == CMD.AUTHENTICATE:
+            # user type, then the null terminated automation code
+            passcode = data[1:].split(b"\x00", 1)[0]
+            if self._automation_code is not None and hmac.compare_digest(
+                passcode, self._automation_code.encode()
+            ):
+                session.authenticated = True
+                return bytes((DATA, 0x01))
+            return bytes((DATA, 0x00))
+        if code == CMD.LOGIN_REMOTE_USER:
+            if self._user_code is not None and hmac.compare_digest(
+                data, _remote_user_code(self._user_code)
+            ):
+                session.authenticated = True
+                return ACK
+            return bytes((NACK, NO_AUTHORITY))
+        if not session.authenticated and code not in UNAUTHENTICATED_COMMANDS:
+            return bytes((NACK, NO_AUTHORITY))
+        if code == CMD.SET_SUBSCRIPTION:
+            # The proxy's own session is always subscribed; data[0] is the format.
+            session.subscribed = any(data[1:])
+            return ACK
+
+        try:
+            if code in STATIC_COMMANDS:
+                result = await self._cached(self._static, code, data)
+            elif code in STATUS_COMMANDS:
+                result = await self._cached_status(code, data)
+            else:
+                self.upstream_requests += 1
+                try:
+                    result = await self.panel.send_command(code, data)
+                finally:
+                    self._status.clear()
+        except NackError as excp:
+            return bytes((NACK, excp.code))
+        except asyncio.InvalidStateError:
+            return bytes((NACK, INVALID_INTERFACE_STATE))
+        return bytes((DATA,)) + result if result else ACK
+
+    async def _cached(
+        self, cache: dict[bytes, asyncio.Future[bytearray]], code: int, data: bytes
+    ) -> bytearray:
+        key = bytes((code,)) + data
+        if (response := cache.get(key)) is None:
+            response = cache[key] = asyncio.ensure_future(self._upstream(cache, key, code, data))
+        else:
+            self.cached_responses += 1
+        return await asyncio.shield(response)
+
+    async def _cached_status(self, code: int, data: bytes) -> bytearray:
+        key = bytes((code,)) + data
+        now = asyncio.get_running_loop().time()
+        entry = self._status.get(key)
+        if entry and now - entry[0] < self._cache_ttl:
+            self.cached_responses += 1
+            return await asyncio.shield(entry[1])
+        response = asyncio.ensure_future(self._upstream(self._status, key, code, data))
+        self._status[key] = (now, response)
+        return await asyncio.shield(response)
+
+    async def _upstream(
+        self, cache: dict[bytes, Any], key: bytes, code: int, data: bytes
+    ) -> bytearray:
+        self.upstream_requests += 1
+        try:
+            return await self.panel.send_command(code, data)
+        except BaseException:
+            # Don't cache failures.
+            cache.pop(key, None)
+            raise
+
+
+class _ClientSession(asyncio.Protocol):
+    def __init__(self, proxy: PanelProxy) -> None:
+        self._proxy = proxy
+        self._transport: asyncio.Transport | None = None
+        self._buffer = bytearray()
+        # Responses are returned in request order, even if they complete out of order.
+        self._responses: deque[tuple[int, asyncio.Task[bytes]]] = deque()
+        self.authenticated = False
+        self.subscribed = False
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        assert isinstance(transport, asyncio.Transport)
+        self._transport = transport
+        if self._proxy._max_clients and len(self._proxy._sessions) >= self._proxy._max_clients:
+            LOG.warning("Rejecting client: %d clients connected", len(self._proxy._sessions))
+            transport.close()
+            return
+        self._proxy._sessions.add(self)
+
+    def connection_lost(self, exc: Exception | None) -> None:
+        self._proxy._sessions.discard(self)
+        self._transport = None
+        for _, task in self._responses:
+            task.cancel()
+        self._responses.clear()
+
+    def close(self) -> None:
+        if self._transport:
+            self._transport.close()
+
+    def write(self, data: bytes) -> None:
+        if self._transport:
+            self._transport.write(data)
+
+    def data_received(self, data: bytes) -> None:
+        self._buffer += data
+        pos = 0
+        end = len(self._buffer)
+        while pos < end:
+            protocol = self._buffer[pos]
+            if protocol == PROTOCOL.BASIC:
+                header = 2
+                if end - pos < header:
+                    break
+                length = self._buffer[pos + 1]
+            elif protocol == PROTOCOL.EXTENDED:
+                header = 3
+                if end - pos < header:
+                    break
+                length = be16(self._buffer, pos + 1)
+            else:
+                LOG.warning("Closing client: unknown protocol 0x%02X", protocol)
+                self.close()
+                return
+            if not length:
+                # Every request carries at least a command code.
+                LOG.warning("Closing client: empty request")
+                self.close()
+                return
+            if end - pos < header + length:
+                break
+            code = self._buffer[pos + header]
+            request = bytes(self._buffer[pos + header + 1 : pos + header + length])
+            task = asyncio.ensure_future(self._proxy._handle(self, code, request))
+            self._responses.append((protocol, task))
+            task.add_done_callback(self._flush)
+            pos += header + length
+        del self._buffer[:pos]
+
+    def _flush(self, _: "asyncio.Task[bytes] | None" = None) -> None:
+        while self._responses and self._responses[0][1].done():
+            protocol, task = self._responses.popleft()
+            if task.cancelled() or task.exception():
+                if not task.cancelled():
+                    LOG.warning("Proxied command failed: %s", task.exception())
+                payload = bytes((NACK, 0x00))
+            else:
+                payload = task.result()
+            if protocol == PROTOCOL.EXTENDED:
+                self.write(bytes((protocol,)) + BE16.pack(len(payload)) + payload)
+            else:
+                self.write(bytes((protocol, len(payload))) + payload)
+
+
+def _remote_user_code(code: str) -> bytes:
+    # As sent by Panel._authenticate_remote_user.
+    return int(code.ljust(8, "F"), 16).to_bytes(4, "big")
@@ -0,0 +1,59 @@
+import asyncio
+import random
+from collections.abc import AsyncGenerator
+from contextlib import asynccontextmanager
+from typing import NamedTuple
+
+
+class ReconnectBackoff(NamedTuple):
+    """Delays between attempts to reconnect a panel, in seconds.
+
+    The first attempt after losing the connection is immediate. Each failed
+    attempt multiplies the delay by factor, starting from initial, up to max.
+    Delays are randomized by up to a fraction jitter either way, so that panels
+    that failed together don't retry together.
+    """
+
+    initial: float = 1.0
+    max: float = 60.0
+    factor: float = 2.0
+    jitter: float = 0.2
+
+    def delay(self, failures: int) -> float:
+        if not failures:
+            return 0.0
+        delay = self.initial * self.factor ** min(failures - 1, 64)
+        return min(delay, self.max) * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+
+class ReconnectScheduler:
+    """Limits how many panels sharing it may connect at the same time.
+
+    Connecting costs a TLS handshake and a full load, so when many panels drop
+    at once (e.g. after a network outage) their reconnects are spread out by a
+    random delay of up to jitter seconds, and at most max_concurrent of them
+    run at any one time.
+    """
+
+    def __init__(self, max_concurrent: int = 8, jitter: float = 10.0) -> None:
+        self.max_concurrent = max_concurrent
+        self.jitter = jitter
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self.waiting = 0
+        self.active = 0
+
+    @asynccontextmanager
+    async def slot(self, reconnect: bool = True) -> AsyncGenerator[None, None]:
+        self.waiting += 1
+        try:
+            if reconnect and self.jitter:
+                await asyncio.sleep(random.uniform(0, self.jitter))
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
@@ -0,0 +1,45 @@
+import ssl
+from typing import Any
+
+
+class ResumingSSLContext(ssl.SSLContext):
+    """A client SSLContext that resumes previous TLS sessions.
+
+    A resumed session skips the key exchange, which is most of the cost of a
+    handshake for the panels' embedded CPUs. Sessions are kept by server
+    hostname, once remember() is called on an established connection.
+    """
+
+    def __init__(self, protocol: int = ssl.PROTOCOL_TLS_CLIENT) -> None:
+        self.sessions: dict[str | None, ssl.SSLSession] = {}
+
+    def wrap_bio(  # type: ignore[override]
+        self,
+        incoming: ssl.MemoryBIO,
+        outgoing: ssl.MemoryBIO,
+        server_side: bool = False,
+        server_hostname: str | None = None,
+        session: ssl.SSLSession | None = None,
+    ) -> ssl.SSLObject:
+        # asyncio connects through wrap_bio, and offers no other way to pass a session.
+        if session is None and not server_side:
+            session = self.sessions.get(server_hostname)
+        return super().wrap_bio(incoming, outgoing, server_side, server_hostname, session)
+
+    def remember(self, ssl_object: Any) -> None:
+        """Keep the session of ssl_object, to resume the next connection to its server.
+
+        Call this once data has been exchanged: TLS 1.3 servers only send the
+        session ticket after the handshake.
+        """
+        if ssl_object.session is not None:
+            self.sessions[ssl_object.server_hostname] = ssl_object.session
+
+
+def client_ssl_context() -> ResumingSSLContext:
+    """TLS settings for panels, which use self-signed certificates."""
+    context = ResumingSSLContext(ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    context.set_ciphers("DEFAULT")
+    return context
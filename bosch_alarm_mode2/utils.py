@@ -6,13 +6,13 @@ class EndianInt:
     def __init__(self, endianness: Literal["little", "big"]) -> None:
         self.byteorder = endianness
 
-    def int8(self, data: bytearray, offset: int = 0) -> int:
+    def int8(self, data: bytes | bytearray | memoryview, offset: int = 0) -> int:
         return int.from_bytes(data[offset : offset + 1], self.byteorder)
 
-    def int16(self, data: bytearray, offset: int = 0) -> int:
+    def int16(self, data: bytes | bytearray | memoryview, offset: int = 0) -> int:
         return int.from_bytes(data[offset : offset + 2], self.byteorder)
 
-    def int32(self, data: bytearray, offset: int = 0) -> int:
+    def int32(self, data: bytes | bytearray | memoryview, offset: int = 0) -> int:
         return int.from_bytes(data[offset : offset + 4], self.byteorder)
 
 
@@ -21,6 +21,8 @@ LE_INT = EndianInt("little")
 
 
 class Observable:
+    __slots__ = ("_observers",)
+
     def __init__(self) -> None:
         self._observers: list[Callable[[], None]] = []
 